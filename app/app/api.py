@@ -0,0 +1,103 @@
+"""Headless JSON API over the card data behind the HTML pages.
+
+Integrations read cards here instead of scraping the rendered page, so a poll
+costs a query and a JSON encode, never a render. Every response carries an
+ETag built from the story version and the request URL, so polling an
+unchanged story costs one version lookup and returns 304.
+
+Card lists are paged by keyset: each page ends with an opaque cursor for the
+next one, and the query resumes from it through an index instead of skipping
+rows, so deep pages cost the same as the first.
+
+Bodies are encoded with orjson when it is installed and with the standard
+library otherwise; both produce the same compact JSON. Install it with
+`uv add orjson`; it is not a default dependency.
+"""
+
+import hashlib
+import json
+from collections.abc import Callable
+from fastapi import HTTPException, Request, Response
+from sqlmodel import SQLModel
+from models import MiceCard, TryCard
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def _api_fields(model: type[SQLModel]) -> tuple[str, ...]:
+    """The model's fields minus its text length columns, which only serve statistics."""
+    lengths = {f"{field}_length" for field in model.TEXT_FIELDS}
+    return tuple(field for field in model.model_fields if field not in lengths)
+
+
+MICE_FIELDS = _api_fields(MiceCard)
+TRY_FIELDS = _api_fields(TryCard)
+
+
+def dumps(value: object) -> bytes:
+    if orjson:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def parse_fields(fields: str | None, allowed: tuple[str, ...]) -> tuple[str, ...]:
+    """Read a comma-separated field selection; no selection means every field."""
+    if not fields:
+        return allowed
+    selected = tuple(field.strip() for field in fields.split(","))
+    unknown = [field for field in selected if field not in allowed]
+    if unknown:
+        raise HTTPException(400, f"Unknown fields {unknown}; choose from {list(allowed)}")
+    return selected
+
+
+def mice_cursor(card: MiceCard) -> str:
+    return str(card.id)
+
+
+def parse_mice_cursor(after: str | None) -> int | None:
+    if after is None:
+        return None
+    if not after.isdigit():
+        raise HTTPException(400, "Malformed cursor")
+    return int(after)
+
+
+def try_cursor(card: TryCard) -> str:
+    # Order keys only use [0-9a-z], so the separator cannot appear in one
+    return f"{card.order_key}:{card.id}"
+
+
+def parse_try_cursor(after: str | None) -> tuple[str, int] | None:
+    if after is None:
+        return None
+    order_key, _, card_id = after.rpartition(":")
+    if not card_id.isdigit():
+        raise HTTPException(400, "Malformed cursor")
+    return order_key, int(card_id)
+
+
+def page(cards: list[SQLModel], limit: int, fields: tuple[str, ...], cursor: Callable[[SQLModel], str]) -> dict:
+    """Shape up to limit cards as a page; callers fetch limit + 1 so a next page can be detected."""
+    items = cards[:limit]
+    return {
+        "items": [{field: getattr(card, field) for field in fields} for card in items],
+        "next": cursor(items[-1]) if len(cards) > limit else None,
+    }
+
+
+def respond(request: Request, story_version: int, build: Callable[[], dict]) -> Response:
+    """Return 304 when the client already has this story version, otherwise build and encode the body."""
+    url = f"{request.url.path}?{request.url.query}"
+    etag = f'"{story_version}-{hashlib.sha256(url.encode()).hexdigest()[:12]}"'
+    # Clients may reuse a response only after checking it is still current
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=dumps(build()), media_type="application/json", headers=headers)
@@ -0,0 +1,16 @@
+"""Throwaway database for the benchmarks that import the app.
+
+Import this before any app module: main.py and database.py build the engine
+from DATABASE_URL at import time, so it has to point here first. The
+directory lasts as long as the benchmark process.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+_data_dir = tempfile.TemporaryDirectory()
+DATA_DIR = Path(_data_dir.name)
+
+os.environ["DATABASE_URL"] = f"sqlite:///{DATA_DIR / 'bench.db'}"
+os.environ["SQL_ECHO"] = "0"
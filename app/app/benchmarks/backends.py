@@ -0,0 +1,71 @@
+"""Measure card write throughput with concurrent writers on each storage backend.
+
+Usage (from the app directory):
+    uv run python -m benchmarks.backends --url postgresql+psycopg://localhost/story_bench
+
+A fresh SQLite file in a temporary directory is always measured. Every --url
+adds another backend; its tables are created and its cards cleared before the
+run. Each writer thread creates a card, then edits it repeatedly through the
+db.py functions, so the numbers include the operation log and version checks.
+"""
+
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+from sqlalchemy import Engine
+from sqlmodel import Session
+import db
+from database import init_db, make_engine
+
+
+def _writer(engine: Engine, deadline: float, counts: list[int], index: int):
+    with Session(engine) as session:
+        card = db.create_mice_card(session, "M", "opening", "closing", 1)
+        card_id, version = card.id, card.version
+        writes = 1
+        while time.perf_counter() < deadline:
+            card = db.update_mice_card(session, card_id, version, "M", f"opening {writes}", "closing", 1)
+            version = card.version
+            writes += 1
+    counts[index] = writes
+
+
+def measure(engine: Engine, writers: int, seconds: float) -> float:
+    """Return committed writes per second across all writer threads."""
+    init_db(engine)
+    with Session(engine) as session:
+        db.clear_all_cards(session, 1)
+
+    counts = [0] * writers
+    deadline = time.perf_counter() + seconds
+    threads = [threading.Thread(target=_writer, args=(engine, deadline, counts, i)) for i in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", action="append", default=[], help="extra database URL to measure")
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        urls = [f"sqlite:///{Path(data_dir) / 'bench.db'}", *args.url]
+        for url in urls:
+            engine = make_engine(url)
+            engine.echo = False
+            for writers in args.writers:
+                throughput = measure(engine, writers, args.seconds)
+                print(f"{engine.dialect.name:<10} {writers:>3} writer(s): {throughput:8.1f} writes/s")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Compare database size and card read time with and without text compression.
+
+Usage (from the app directory): uv run python -m benchmarks.compression --cards 500 --words 1500
+
+Cards get pseudo-prose drafts of --words words drawn from the template
+vocabulary. The same cards are written to two temporary databases, one with
+compression disabled, and each is measured for file size and for the time to
+load every card back.
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+from sqlalchemy import text
+from sqlmodel import Session
+import compression
+import db
+from database import init_db, make_engine
+from models import MiceCard, TryCard
+from templates import TEMPLATES
+
+
+def _vocabulary() -> list[str]:
+    words = []
+    for template in TEMPLATES.values():
+        for card in template["mice_cards"]:
+            words += f"{card['opening']} {card['closing']}".split()
+        for card in template["try_cards"]:
+            words += f"{card['attempt']} {card['failure']} {card['consequence']}".split()
+    return words
+
+
+def _draft(vocabulary: list[str], words: int) -> str:
+    return " ".join(random.choices(vocabulary, k=words))
+
+
+def measure(path: Path, cards: int, words: int, reads: int) -> tuple[int, float]:
+    """Write the cards to a fresh database; return (file bytes, seconds per full read)."""
+    random.seed(1)
+    vocabulary = _vocabulary()
+    engine = make_engine(f"sqlite:///{path}")
+    engine.echo = False
+    init_db(engine)
+    with Session(engine) as session:
+        session.add_all(
+            MiceCard(code="M", opening=_draft(vocabulary, words), closing=_draft(vocabulary, words), nesting_level=1)
+            for _ in range(cards)
+        )
+        session.add_all(
+            TryCard(
+                type="Failure",
+                order_num=n,
+                attempt=_draft(vocabulary, words),
+                failure=_draft(vocabulary, words),
+                consequence=_draft(vocabulary, words),
+            )
+            for n in range(cards)
+        )
+        session.commit()
+    with engine.connect() as connection:
+        connection.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        connection.execute(text("VACUUM"))
+
+    started = time.perf_counter()
+    for _ in range(reads):
+        with Session(engine) as session:
+            db.get_all_mice_cards(session)
+            db.get_all_try_cards(session)
+    elapsed = (time.perf_counter() - started) / reads
+    engine.dispose()
+    return path.stat().st_size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=500, help="MICE cards and Try/Fail cards each")
+    parser.add_argument("--words", type=int, default=1500, help="words per card text field")
+    parser.add_argument("--reads", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        threshold = compression.COMPRESS_MIN_BYTES
+        compression.COMPRESS_MIN_BYTES = float("inf")
+        plain_size, plain_read = measure(Path(data_dir) / "plain.db", args.cards, args.words, args.reads)
+        compression.COMPRESS_MIN_BYTES = threshold
+        packed_size, packed_read = measure(Path(data_dir) / "compressed.db", args.cards, args.words, args.reads)
+
+    print(f"{'':<12} {'file MB':>9} {'read all ms':>12}")
+    print(f"{'plain':<12} {plain_size / 1_000_000:9.1f} {plain_read * 1000:12.1f}")
+    print(f"{'compressed':<12} {packed_size / 1_000_000:9.1f} {packed_read * 1000:12.1f}")
+    print(f"size ratio {plain_size / packed_size:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Replay a synthetic writer workload against the app and report per-route latency.
+
+Usage (from the app directory): uv run python -m benchmarks.loadtest --writers 8 --seconds 30
+
+Each simulated writer is a separate client (with its own rate-limit bucket)
+that drives the app in-process through its ASGI interface, against a
+temporary database. Writers mostly reload the page and edit cards the way the
+browser does: open the edit form, change a field, submit it with the version
+the form carried. Now and then one loads a template or clears the story.
+Throughput and p50/p95/p99 latency are reported per route and status code, so
+a fast rejection (409, 429) is never averaged into the time a save takes.
+
+Writers send requests back to back, far faster than the default mutation rate
+limit allows a person to, so the limit is raised here unless MUTATION_RATE and
+MUTATION_BURST are set; set them to measure the app as deployed.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import re
+import statistics
+import time
+from collections import defaultdict
+from html.parser import HTMLParser
+
+# Points the app at a throwaway database, so it must come before any app import
+from benchmarks import _setup  # noqa: F401
+# traffic.py reads the rate limit at import time
+os.environ.setdefault("MUTATION_RATE", "100000")
+os.environ.setdefault("MUTATION_BURST", "100000")
+
+import httpx
+import main
+from templates import TEMPLATES
+
+# Relative frequency of each writer action
+ACTIONS = {
+    "view": 50,
+    "edit_mice": 20,
+    "edit_try": 20,
+    "load_template": 7,
+    "clear": 3,
+}
+
+CARD_ID_PATTERN = re.compile(r'id="(mice|try)-card-(\d+)"')
+
+
+class _FormFields(HTMLParser):
+    """Collect the values a browser would submit for the first form in a fragment."""
+
+    def __init__(self):
+        super().__init__()
+        self.fields: dict[str, str] = {}
+        self._textarea: str | None = None
+        self._select: str | None = None
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]):
+        attributes = dict(attrs)
+        if tag == "input":
+            self.fields[attributes["name"]] = attributes.get("value") or ""
+        elif tag == "textarea":
+            self._textarea = attributes["name"]
+            self.fields[self._textarea] = ""
+        elif tag == "select":
+            self._select = attributes["name"]
+        elif tag == "option" and self._select and ("selected" in attributes or self._select not in self.fields):
+            self.fields[self._select] = attributes["value"]
+
+    def handle_endtag(self, tag: str):
+        if tag == "textarea":
+            self._textarea = None
+        elif tag == "select":
+            self._select = None
+
+    def handle_data(self, data: str):
+        if self._textarea:
+            self.fields[self._textarea] += data
+
+
+def _form_fields(html: str) -> dict[str, str]:
+    parser = _FormFields()
+    parser.feed(html)
+    return parser.fields
+
+
+class Writer:
+    """One simulated user, remembering the card ids from the last page it loaded."""
+
+    def __init__(self, client: httpx.AsyncClient, timings: dict):
+        self.client = client
+        self.timings = timings
+        self.card_ids: dict[str, list[int]] = {"mice": [], "try": []}
+
+    async def request(self, route: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self.client.request(method, url, **kwargs)
+        self.timings[route, response.status_code].append(time.perf_counter() - started)
+        return response
+
+    async def view(self):
+        response = await self.request("GET /", "GET", "/")
+        self.card_ids = {"mice": [], "try": []}
+        for kind, card_id in CARD_ID_PATTERN.findall(response.text):
+            self.card_ids[kind].append(int(card_id))
+
+    async def edit(self, kind: str, edited_field: str):
+        if not self.card_ids[kind]:
+            return await self.view()
+        card_id = random.choice(self.card_ids[kind])
+        form = await self.request(f"GET /{kind}-edit/{{id}}", "GET", f"/{kind}-edit/{card_id}")
+        if not form.text:
+            return await self.view()
+        fields = _form_fields(form.text)
+        fields[edited_field] = f"Draft {random.randrange(1_000_000)}"
+        await self.request(f"PUT /{kind}-cards/{{id}}", "PUT", f"/{kind}-cards/{card_id}", data=fields)
+
+    async def edit_mice(self):
+        await self.edit("mice", random.choice(["opening", "closing"]))
+
+    async def edit_try(self):
+        await self.edit("try", random.choice(["attempt", "failure", "consequence"]))
+
+    async def load_template(self):
+        name = random.choice(list(TEMPLATES))
+        await self.request("POST /load-template/{name}", "POST", f"/load-template/{name}")
+
+    async def clear(self):
+        await self.request("POST /clear-data", "POST", "/clear-data")
+
+    async def run(self, deadline: float):
+        await self.view()
+        names, weights = list(ACTIONS), list(ACTIONS.values())
+        while time.perf_counter() < deadline:
+            await getattr(self, random.choices(names, weights)[0])()
+
+
+def _percentile(sorted_seconds: list[float], fraction: float) -> float:
+    return sorted_seconds[min(len(sorted_seconds) - 1, int(fraction * len(sorted_seconds)))] * 1000
+
+
+async def run(writers: int, seconds: float, seed: int):
+    random.seed(seed)
+    # Seconds per (route, status code)
+    timings: dict[tuple[str, int], list[float]] = defaultdict(list)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://loadtest") as client:
+        await client.post("/load-template/mystery")
+
+    clients = [
+        httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app, client=(f"10.0.0.{i + 1}", 40000)), base_url="http://loadtest")
+        for i in range(writers)
+    ]
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    await asyncio.gather(*[Writer(client, timings).run(deadline) for client in clients])
+    elapsed = time.perf_counter() - started
+    for client in clients:
+        await client.aclose()
+
+    total = sum(len(samples) for samples in timings.values())
+    print(f"{writers} writers, {elapsed:.1f}s, {total} requests, {total / elapsed:.1f} req/s")
+    print(f"{'route':<30} {'status':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, status in sorted(timings):
+        samples = sorted(timings[route, status])
+        print(
+            f"{route:<30} {status:>6} {len(samples) / elapsed:8.1f} "
+            f"{statistics.median(samples) * 1000:8.1f} {_percentile(samples, 0.95):8.1f} {_percentile(samples, 0.99):8.1f}"
+        )
+
+
+def cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(run(args.writers, args.seconds, args.seed))
+
+
+if __name__ == "__main__":
+    cli()
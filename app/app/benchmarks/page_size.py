@@ -0,0 +1,95 @@
+"""Measure how many bytes the story page spends per card.
+
+Usage (from the app directory): uv run python -m benchmarks.page_size --cards 1000
+
+Renders the page for the mystery template's MICE cards plus --cards Try/Fail
+cards with template text, and reports the page size raw and gzipped and the
+markup each Try/Fail card adds. Exits with status 1 if a card costs more than
+--max-card-bytes.
+
+To compare two versions of the app, run it on the old one with --save
+before.json, then on the new one with --compare before.json; that run also
+exits with status 1 if any size grew by more than --max-growth.
+"""
+
+import argparse
+import gzip
+import json
+import sys
+from pathlib import Path
+
+# Points the app at a throwaway database, so it must come before any app import
+from benchmarks import _setup  # noqa: F401
+
+from sqlmodel import Session
+import db
+import main
+from database import engine
+
+
+def _fill_story(cards: int):
+    """Replace the story with the mystery template, its Try/Fail cards repeated to `cards` cards."""
+    mice_rows, template_try_rows = main.TEMPLATE_ROWS["mystery"]
+    try_rows = [
+        {**template_try_rows[n % len(template_try_rows)], "order_num": n + 1, "order_key": f"{n:08d}"}
+        for n in range(cards)
+    ]
+    with Session(engine) as session:
+        db.load_template_data(session, main.STORY_ID, mice_rows, try_rows)
+
+
+def _page_bytes(cards: int) -> tuple[int, int]:
+    """Render the page for a story of `cards` Try/Fail cards; return (raw bytes, gzipped bytes)."""
+    _fill_story(cards)
+    with Session(engine) as session:
+        story_version = db.get_story_version(session, main.STORY_ID)
+    page = main._render_index(story_version).encode()
+    return len(page), len(gzip.compress(page))
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=1000)
+    parser.add_argument("--max-card-bytes", type=int, default=1500)
+    parser.add_argument("--save", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="print the change from results saved earlier")
+    parser.add_argument("--max-growth", type=float, default=0.02, help="largest allowed growth over --compare, as a fraction")
+    args = parser.parse_args()
+
+    empty_bytes, _ = _page_bytes(0)
+    page_bytes, gzip_bytes = _page_bytes(args.cards)
+    results = {
+        "cards": args.cards,
+        "page_bytes": page_bytes,
+        "gzip_bytes": gzip_bytes,
+        "card_bytes": round((page_bytes - empty_bytes) / args.cards),
+    }
+    print(
+        f"{args.cards} cards: page {page_bytes / 1000:.1f} kB ({gzip_bytes / 1000:.1f} kB gzipped), "
+        f"{results['card_bytes']} bytes per Try/Fail card"
+    )
+
+    failed = False
+    if args.compare:
+        before = json.loads(args.compare.read_text())
+        if before["cards"] != args.cards:
+            print(f"{args.compare} was measured with {before['cards']} cards, not {args.cards}")
+            sys.exit(1)
+        for name in ("page_bytes", "gzip_bytes", "card_bytes"):
+            change = (results[name] - before[name]) / before[name]
+            print(f"  {name}: {before[name]} -> {results[name]} ({change:+.1%})")
+            failed |= change > args.max_growth
+        if failed:
+            print(f"page size grew by more than {args.max_growth:.0%}")
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2))
+
+    if results["card_bytes"] > args.max_card_bytes:
+        print(f"a Try/Fail card costs more than {args.max_card_bytes} bytes")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,87 @@
+"""Check that the streamed story page keeps peak memory flat as stories grow.
+
+Usage (from the app directory): uv run python -m benchmarks.render_memory --cards 1000 10000 50000
+
+For each story size, the Try/Fail cards are inserted into a temporary database
+and the streamed page is consumed chunk by chunk under tracemalloc. Exits with
+status 1 if any peak exceeds --max-peak-mb, or if the largest story peaks more
+than --max-peak-growth times higher than the smallest, so a change that makes
+memory grow with the story fails even while it is under the budget. The
+streamed page is also compared with the whole-page render on a small story,
+so both modes stay identical.
+"""
+
+import argparse
+import sys
+import tracemalloc
+
+# Points the app at a throwaway database, so it must come before any app import
+from benchmarks import _setup  # noqa: F401
+
+from sqlmodel import Session, insert
+import db
+import main
+from database import engine
+from models import TryCard
+
+
+def _fill_story(cards: int):
+    """Replace the story with the mystery template's MICE cards and `cards` Try/Fail cards."""
+    mice_rows, _ = main.TEMPLATE_ROWS["mystery"]
+    with Session(engine) as session:
+        db.load_template_data(session, main.STORY_ID, mice_rows, [])
+    rows = [
+        {"type": "Failure", "order_num": n, "attempt": f"Attempt {n}", "failure": "It fails", "consequence": "Stakes rise"}
+        for n in range(1, cards + 1)
+    ]
+    with engine.begin() as connection:
+        connection.execute(insert(TryCard), rows)
+
+
+def _peak_stream_bytes() -> tuple[int, int]:
+    """Consume the streamed page; return (peak traced bytes, page bytes)."""
+    story_version = main._read_story_size()[0]
+    tracemalloc.start()
+    page_bytes = sum(len(chunk) for chunk in main.stream_index(story_version))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, page_bytes
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--max-peak-mb", type=float, default=8.0)
+    parser.add_argument(
+        "--max-peak-growth", type=float, default=1.5,
+        help=f"largest story's peak over the smallest's; give --cards above one stream batch ({main.STREAM_BATCH_SIZE})"
+    )
+    args = parser.parse_args()
+
+    _fill_story(20)
+    story_version = main._read_story_size()[0]
+    if "".join(main.stream_index(story_version)) != main._render_index(story_version):
+        print("streamed page differs from the whole-page render")
+        sys.exit(1)
+
+    peaks = {}
+    for cards in args.cards:
+        _fill_story(cards)
+        peak, page_bytes = _peak_stream_bytes()
+        peaks[cards] = peak / 1_000_000
+        print(f"{cards:>7} cards: page {page_bytes / 1_000_000:7.1f} MB, peak memory {peaks[cards]:5.1f} MB")
+
+    failed = False
+    if max(peaks.values()) > args.max_peak_mb:
+        print(f"peak memory exceeded {args.max_peak_mb} MB")
+        failed = True
+    growth = peaks[max(peaks)] / peaks[min(peaks)]
+    if growth > args.max_peak_growth:
+        print(f"peak memory grew {growth:.2f}x from {min(peaks)} to {max(peaks)} cards, over {args.max_peak_growth}x")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,77 @@
+"""Compare concurrent writes to different stories in one database and in per-story shards.
+
+Usage (from the app directory): uv run python -m benchmarks.shards --writers 1 4 16
+
+Each writer thread edits a card of its own story through the db.py functions.
+In the shared run every story lives in one SQLite file, so writers queue on
+its lock; in the sharded run each story gets its own file through
+database.engine_for, as with SHARD_DIR set.
+"""
+
+import argparse
+import os
+import threading
+import time
+
+# Points the app at a throwaway database, so it must come before any app import
+from benchmarks._setup import DATA_DIR
+
+# database.py reads this at import time
+os.environ["SHARD_DIR"] = str(DATA_DIR / "shards")
+
+from sqlalchemy import Engine
+from sqlmodel import Session
+import database
+import db
+from models import MiceCard
+
+
+def _writer(engine: Engine, story_id: int, deadline: float, counts: list[int], index: int):
+    with Session(engine) as session:
+        card = MiceCard(story_id=story_id, code="M", opening="opening", closing="closing", nesting_level=1)
+        session.add(card)
+        session.commit()
+        card_id, version = card.id, card.version
+        writes = 1
+        while time.perf_counter() < deadline:
+            card = db.update_mice_card(session, card_id, version, "M", f"opening {writes}", "closing", 1)
+            version = card.version
+            writes += 1
+    counts[index] = writes
+
+
+def measure(engine_for, writers: int, seconds: float, first_story: int) -> float:
+    """Return committed writes per second with one writer per story."""
+    story_ids = range(first_story, first_story + writers)
+    engines = [engine_for(story_id) for story_id in story_ids]
+    counts = [0] * writers
+    deadline = time.perf_counter() + seconds
+    threads = [
+        threading.Thread(target=_writer, args=(engine, story_id, deadline, counts, i))
+        for i, (engine, story_id) in enumerate(zip(engines, story_ids))
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    database.init_db(database.engine)
+    first_story = 1
+    for writers in args.writers:
+        shared = measure(lambda story_id: database.engine, writers, args.seconds, first_story)
+        sharded = measure(database.engine_for, writers, args.seconds, first_story + writers)
+        first_story += 2 * writers
+        print(f"{writers:>3} writer(s): shared {shared:8.1f} writes/s, sharded {sharded:8.1f} writes/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""Check rendered HTML against golden files and track render time and size.
+
+Usage (from the app directory):
+    uv run python -m benchmarks.snapshots            # compare with the goldens
+    uv run python -m benchmarks.snapshots --update   # accept the current output
+
+Every component in components.py and forms.py, and every page, fragment and
+JSON route, is rendered against fixture stories: each of TEMPLATES, an empty
+story, long card text that renders as previews, and broken nesting that
+renders validation issues. Outputs are compared byte for byte with the files in
+benchmarks/snapshots/, and a unified diff is printed for each mismatch.
+
+metrics.json there records each snapshot's size and fastest render time. A
+check also fails when a snapshot renders more than --max-slowdown slower than
+recorded. Times depend on the machine, so run --update on the one that runs
+the checks before relying on them. --update rewrites the goldens and metrics
+and prints how each size and time changed, so the cost of a markup change
+shows up in review.
+"""
+
+import argparse
+import difflib
+import json
+import os
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+# Points the app at a throwaway database, so it must come before any app import
+from benchmarks import _setup  # noqa: F401
+# Time each route's queries on every run, not read-cache hits that depend on what ran before
+os.environ["CACHE_BACKEND"] = "none"
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+import components
+import db
+import forms
+import main
+import validation
+from database import engine
+from templates import TEMPLATES
+
+SNAPSHOT_DIR = Path(__file__).parent / "snapshots"
+METRICS_PATH = SNAPSHOT_DIR / "metrics.json"
+# Slowdowns smaller than this are timer noise, whatever the ratio
+TIME_NOISE_MS = 0.25
+
+_LONG_TEXT = "The fog rolls in over the harbour while the detective retraces the night of the murder. " * 8
+
+FIXTURES = {
+    **{name: (template["mice_cards"], template["try_cards"]) for name, template in TEMPLATES.items()},
+    "empty": ([], []),
+    "long_text": (
+        [{"code": "I", "opening": _LONG_TEXT, "closing": "The killer is named.", "nesting_level": 1}],
+        [{"type": "Failure", "order_num": 1, "attempt": _LONG_TEXT, "failure": "It fails", "consequence": _LONG_TEXT}],
+    ),
+    "broken_nesting": (
+        [
+            {"code": "M", "opening": "Arrives", "closing": "Leaves", "nesting_level": 1},
+            {"code": "I", "opening": "Asks", "closing": "Answers", "nesting_level": 1},
+            {"code": "C", "opening": "Doubts", "closing": "Grows", "nesting_level": 3},
+        ],
+        [],
+    ),
+}
+
+# Routes rendered once per fixture; the ids are those of each fixture's first cards
+STORY_ROUTES = {
+    "index.html": "/",
+    "route_mice_card.html": "/mice-card/1",
+    "route_try_card.html": "/try-card/1",
+    "route_mice_edit.html": "/mice-edit/1",
+    "route_try_edit.html": "/try-edit/1",
+    "api_mice_cards.json": "/api/v1/stories/1/mice-cards",
+    "api_try_cards.json": "/api/v1/stories/1/try-cards?limit=2&fields=id,type,order_num",
+    "api_outline.json": "/api/v1/stories/1/outline",
+    "stats.json": "/stories/1/stats",
+}
+
+# Routes that do not depend on the story
+STATIC_ROUTES = {
+    "route_mice_form.html": "/mice-form",
+    "route_try_form.html": "/try-form",
+    "route_clear_form.html": "/clear-form",
+    "route_clear_try_form.html": "/clear-try-form",
+    "route_help_panel.html": "/fragments/help-panel",
+    "route_templates_modal.html": "/fragments/templates-modal",
+    "route_card_styles.css": "/styles/cards.css",
+}
+
+
+def _load_fixture(mice_data: list[dict], try_data: list[dict]):
+    with Session(engine) as session:
+        db.load_template_data(session, main.STORY_ID, *db.prepare_template_rows(mice_data, try_data))
+
+
+def _story_renders(client: TestClient) -> dict[str, Callable[[], str]]:
+    """Renders for the story currently loaded: every card component, then every story route."""
+    with Session(engine) as session:
+        mice_cards = db.get_all_mice_cards(session)
+        try_cards = db.get_all_try_cards(session)
+        story_version = db.get_story_version(session, main.STORY_ID)
+    issues = validation.validate_story(main.STORY_ID, story_version, mice_cards)
+
+    renders = {
+        "mice_card.html": lambda: "".join(components.render_mice_card(card).render() for card in mice_cards),
+        "try_card.html": lambda: "".join(components.render_try_card(card).render() for card in try_cards),
+        "timeline_try_item.html": lambda: "".join(
+            components.render_timeline_try_item(card).render() for card in try_cards
+        ),
+        "nesting_diagram.html": lambda: components.render_nesting_diagram(mice_cards, issues).render(),
+        "story_timeline.html": lambda: components.render_story_timeline(mice_cards, try_cards).render(),
+        "mice_card_form.html": lambda: "".join(forms.mice_card_form(card).render() for card in mice_cards),
+        "try_card_form.html": lambda: "".join(forms.try_card_form(card).render() for card in try_cards),
+        "mice_edit_form.html": lambda: "".join(forms.mice_edit_form_html(card) for card in mice_cards),
+        "try_edit_form.html": lambda: "".join(forms.try_edit_form_html(card) for card in try_cards),
+    }
+    for name, url in STORY_ROUTES.items():
+        renders[name] = lambda url=url: client.get(url).text
+    return renders
+
+
+def _static_renders(client: TestClient) -> dict[str, Callable[[], str]]:
+    renders = {
+        "help_panel.html": lambda: components.render_mice_help_panel().render(),
+        "templates_modal.html": lambda: components.render_templates_modal().render(),
+        "mice_create_form.html": lambda: forms.mice_card_form().render(),
+        "try_create_form.html": lambda: forms.try_card_form().render(),
+        **{
+            f"export_status_{status}.html": lambda status=status: components.render_export_status(1, 7, status).render()
+            for status in ("queued", "running", "done", "failed")
+        },
+    }
+    for name, url in STATIC_ROUTES.items():
+        renders[name] = lambda url=url: client.get(url).text
+    return renders
+
+
+def _measure(render: Callable[[], str], repeat: int) -> tuple[str, float]:
+    """Render repeat times; return the output and the fastest time in milliseconds.
+
+    The fastest run is the one least disturbed by the rest of the machine, so
+    it moves less between runs than the median.
+    """
+    output = render()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render()
+        times.append((time.perf_counter() - started) * 1000)
+    return output, min(times)
+
+
+def render_all(repeat: int) -> dict[str, tuple[str, float]]:
+    """Render every snapshot; keys are paths relative to SNAPSHOT_DIR."""
+    snapshots = {}
+    client = TestClient(main.app)
+    for name, render in _static_renders(client).items():
+        snapshots[f"static/{name}"] = _measure(render, repeat)
+    # Fixtures load in a fixed order so card ids and story versions repeat from run to run
+    for fixture, (mice_data, try_data) in FIXTURES.items():
+        _load_fixture(mice_data, try_data)
+        for name, render in _story_renders(client).items():
+            snapshots[f"{fixture}/{name}"] = _measure(render, repeat)
+    return snapshots
+
+
+def _diff(expected: str, actual: str, path: str) -> str:
+    """Unified diff with one tag per line, since rendered HTML is a single line."""
+    def split(text: str) -> list[str]:
+        return text.replace("><", ">\n<").splitlines(keepends=True)
+
+    return "".join(difflib.unified_diff(split(expected), split(actual), f"golden/{path}", f"rendered/{path}"))
+
+
+def check(snapshots: dict[str, tuple[str, float]], max_slowdown: float) -> list[str]:
+    """Compare snapshots with the goldens and recorded times; return the failures."""
+    recorded = json.loads(METRICS_PATH.read_text())
+    failures = []
+    for path, (output, render_ms) in snapshots.items():
+        golden = SNAPSHOT_DIR / path
+        if not golden.exists() or path not in recorded:
+            failures.append(f"{path}: no golden file; run with --update to add it")
+            continue
+        expected = golden.read_text(encoding="utf-8")
+        if output != expected:
+            failures.append(f"{path}: output differs from the golden file\n{_diff(expected, output, path)}")
+        baseline_ms = recorded[path]["render_ms"]
+        if render_ms > baseline_ms * (1 + max_slowdown) and render_ms - baseline_ms > TIME_NOISE_MS:
+            failures.append(f"{path}: rendered in {render_ms:.3f} ms, recorded {baseline_ms:.3f} ms")
+    for path in recorded.keys() - snapshots.keys():
+        failures.append(f"{path}: golden file is no longer rendered; run with --update to drop it")
+    return failures
+
+
+def update(snapshots: dict[str, tuple[str, float]]):
+    """Rewrite the goldens and metrics, printing how each snapshot's size and time changed."""
+    recorded = json.loads(METRICS_PATH.read_text()) if METRICS_PATH.exists() else {}
+    metrics = {}
+    for path, (output, render_ms) in snapshots.items():
+        golden = SNAPSHOT_DIR / path
+        golden.parent.mkdir(parents=True, exist_ok=True)
+        golden.write_text(output, encoding="utf-8")
+        metrics[path] = {"bytes": len(output.encode()), "render_ms": round(render_ms, 4)}
+        before = recorded.get(path)
+        if before is None:
+            print(f"{path}: new, {metrics[path]['bytes']} bytes, {render_ms:.3f} ms")
+        elif before["bytes"] != metrics[path]["bytes"]:
+            print(f"{path}: {before['bytes']} -> {metrics[path]['bytes']} bytes, "
+                  f"{before['render_ms']:.3f} -> {render_ms:.3f} ms")
+    for path in recorded.keys() - snapshots.keys():
+        (SNAPSHOT_DIR / path).unlink(missing_ok=True)
+        print(f"{path}: removed")
+    METRICS_PATH.write_text(json.dumps(metrics, indent=2, sort_keys=True) + "\n")
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--update", action="store_true", help="accept the current output as the new goldens")
+    parser.add_argument("--repeat", type=int, default=20, help="timed renders per snapshot")
+    parser.add_argument("--max-slowdown", type=float, default=1.0, help="allowed render time increase, as a fraction")
+    args = parser.parse_args()
+
+    snapshots = render_all(args.repeat)
+    if args.update:
+        update(snapshots)
+        return
+
+    failures = check(snapshots, args.max_slowdown)
+    for failure in failures:
+        print(failure)
+    total_bytes = sum(len(output.encode()) for output, _ in snapshots.values())
+    print(f"{len(snapshots)} snapshots, {total_bytes / 1000:.1f} kB, {len(failures)} failure(s)")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,85 @@
+"""Measure GET / throughput as the number of worker processes grows.
+
+Usage (from the app directory): uv run python -m benchmarks.workers --workers 1 2 4
+
+Each run starts serve.py against a fresh database in a temporary directory,
+loads the mystery template, then keeps a fixed number of concurrent requests
+in flight for the measurement window.
+"""
+
+import argparse
+import asyncio
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+import httpx
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+
+async def _wait_until_up(client: httpx.AsyncClient):
+    for _ in range(100):
+        try:
+            await client.get("/")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def _measure(base_url: str, concurrency: int, seconds: float) -> float:
+    """Return completed requests per second for GET / over the window."""
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        await _wait_until_up(client)
+        await client.post("/load-template/mystery")
+
+        completed = 0
+        deadline = time.perf_counter() + seconds
+
+        async def worker():
+            nonlocal completed
+            while time.perf_counter() < deadline:
+                response = await client.get("/")
+                response.raise_for_status()
+                completed += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        return completed / (time.perf_counter() - started)
+
+
+def run_with_workers(workers: int, port: int, concurrency: int, seconds: float) -> float:
+    with tempfile.TemporaryDirectory() as data_dir:
+        server = subprocess.Popen(
+            [sys.executable, str(APP_DIR / "serve.py"), "--workers", str(workers), "--port", str(port)],
+            cwd=data_dir,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            return asyncio.run(_measure(f"http://127.0.0.1:{port}", concurrency, seconds))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    baseline = None
+    for workers in args.workers:
+        throughput = run_with_workers(workers, args.port, args.concurrency, args.seconds)
+        baseline = baseline or throughput
+        print(f"{workers} worker(s): {throughput:8.1f} req/s  ({throughput / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Compare card save throughput with and without the write-behind queue.
+
+Usage (from the app directory): uv run python -m benchmarks.write_behind --writers 1 4 16
+
+Each writer thread repeatedly saves its own MICE card. Direct mode commits
+every save through db.update_mice_card; write-behind mode measures
+acknowledged saves, then flushes and checks that every save reached the
+database.
+"""
+
+import argparse
+import os
+import threading
+import time
+
+# Points the app at a throwaway database, so it must come before any app import
+from benchmarks._setup import DATA_DIR
+
+# The write-behind module reads its journal location at import time
+os.environ["WRITE_BEHIND_JOURNAL"] = str(DATA_DIR / "bench.journal")
+
+from sqlmodel import Session
+import db
+import write_behind
+from database import init_db, make_engine
+from models import MiceCard
+
+
+def _run_writers(writers: int, seconds: float, save) -> float:
+    """Call save(writer_index, n) from each thread until time runs out; return saves per second."""
+    counts = [0] * writers
+    deadline = time.perf_counter() + seconds
+
+    def writer(index: int):
+        while time.perf_counter() < deadline:
+            save(index, counts[index])
+            counts[index] += 1
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--fsync", action="store_true", help="fsync the journal on every save")
+    args = parser.parse_args()
+    write_behind.FSYNC = args.fsync
+
+    engine = make_engine(os.environ["DATABASE_URL"])
+    engine.echo = False
+    init_db(engine)
+
+    for writers in args.writers:
+        with Session(engine) as session:
+            db.clear_all_cards(session, 1)
+            card_ids = [db.create_mice_card(session, "M", "opening", "closing", 1).id for _ in range(writers)]
+
+        def direct_save(index: int, n: int):
+            with Session(engine) as session:
+                db.update_mice_card(session, card_ids[index], n + 1, "M", f"opening {n}", "closing", 1)
+
+        direct = _run_writers(writers, args.seconds, direct_save)
+
+        with Session(engine) as session:
+            start_versions = [db.get_mice_card(session, card_id).version for card_id in card_ids]
+
+        def queued_save(index: int, n: int):
+            version = start_versions[index] + n
+            write_behind.enqueue(MiceCard.__tablename__, 1, card_ids[index], version, {"opening": f"opening {n}"})
+
+        write_behind.start(lambda story_id: engine)
+        queued = _run_writers(writers, args.seconds, queued_save)
+        write_behind.stop()
+
+        with Session(engine) as session:
+            landed = sum(db.get_mice_card(session, card_id).version - start for card_id, start in zip(card_ids, start_versions))
+        print(
+            f"{writers:>3} writer(s): direct {direct:8.1f} saves/s, "
+            f"write-behind {queued:9.1f} saves/s ({landed} saves committed)"
+        )
+
+
+if __name__ == "__main__":
+    main()
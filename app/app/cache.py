@@ -0,0 +1,147 @@
+"""Read-through cache for the card queries in db.py.
+
+Card reads are cached as plain dicts under keys like
+"story_builder.db/mice_cards:3" and "story_builder.db/mice_cards:all", prefixed
+with the database they were read from since every story shard numbers its
+cards from 1. db.py drops exactly the keys a committed change touches, so
+with the default in-process LRU a read never returns data older than the last
+commit in this process. CACHE_TTL_SECONDS bounds how long an entry can miss a
+change committed by another process.
+
+CACHE_BACKEND picks the store:
+- lru (default): in-process LRU with a TTL, for a single worker
+- redis: a Redis server at CACHE_REDIS_URL, shared by every worker so their
+  invalidations reach each other. Install it with `uv add redis`; it is not a
+  default dependency.
+- none: no caching
+
+serve.py turns the LRU off when it starts several workers, since each worker's
+LRU would only see its own writes.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Callable, Iterable
+
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "lru")
+CACHE_TTL_SECONDS = float(os.environ.get("CACHE_TTL_SECONDS", "60"))
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "1024"))
+CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+
+class LRUCache:
+    """Bounded in-process store whose entries also expire after ttl_seconds."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> (expiry time, value), least recently used first
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> object | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: object):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, keys: Iterable[str]):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisCache:
+    """Store shared by every worker through a Redis server."""
+
+    PREFIX = "story_builder:"
+
+    def __init__(self, url: str, ttl_seconds: float):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str) -> object | None:
+        value = self.client.get(self.PREFIX + key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key: str, value: object):
+        self.client.set(self.PREFIX + key, json.dumps(value), px=int(self.ttl_seconds * 1000))
+
+    def delete(self, keys: Iterable[str]):
+        self.client.delete(*(self.PREFIX + key for key in keys))
+
+    def size(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(self.PREFIX + "*"))
+
+
+def _make_store() -> LRUCache | RedisCache | None:
+    if CACHE_BACKEND == "redis":
+        return RedisCache(CACHE_REDIS_URL, CACHE_TTL_SECONDS)
+    if CACHE_BACKEND == "lru":
+        return LRUCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+    return None
+
+
+_store = _make_store()
+_hits: Counter[str] = Counter()
+_misses: Counter[str] = Counter()
+# Bumped by every invalidation; a load that overlapped one may have read the
+# old rows, so its result is returned but not stored
+_generation = 0
+
+
+def read_through[T](metric: str, key: str, load: Callable[[], T | None]) -> T | None:
+    """Return the cached value for key, or load and cache it. None results are not cached."""
+    if _store is None:
+        return load()
+    value = _store.get(key)
+    if value is not None:
+        _hits[metric] += 1
+        return value
+    _misses[metric] += 1
+    generation = _generation
+    value = load()
+    if value is not None and generation == _generation:
+        _store.set(key, value)
+    return value
+
+
+def invalidate(keys: Iterable[str]):
+    """Drop keys after the change that made them stale has committed."""
+    global _generation
+    _generation += 1
+    if _store is not None:
+        _store.delete(keys)
+
+
+def metrics() -> dict:
+    """Hit and miss counts per cached query since this process started."""
+    queries = {}
+    for metric in sorted(_hits.keys() | _misses.keys()):
+        hits, misses = _hits[metric], _misses[metric]
+        queries[metric] = {"hits": hits, "misses": misses, "hit_rate": round(hits / (hits + misses), 3)}
+    return {
+        "backend": CACHE_BACKEND if _store is not None else "none",
+        "entries": _store.size() if _store is not None else 0,
+        "queries": queries,
+    }
@@ -1,7 +1,10 @@
 """UI components for rendering MICE cards, Try/Fail cards, and story structure visualizations."""
 
+import json
+from pathlib import Path
 import air
 from models import MiceCard, TryCard
+from outline import order_outline
 
 # Tooltip content for MICE card types
 MICE_TOOLTIPS = {
@@ -36,43 +39,88 @@ TRY_COLORS = {
 }
 
 
+# Card text longer than this renders as a preview; the rest is fetched when expanded
+PREVIEW_CHARS = 280
+
+
+def text_preview(text: str, full_text_url: str) -> tuple:
+    """Children for a text span: the whole text, or a preview with a button that loads the rest."""
+    if len(text) <= PREVIEW_CHARS:
+        return (text,)
+    return (
+        text[:PREVIEW_CHARS] + "… ",
+        air.Button(
+            "Show more",
+            type="button",
+            class_="link link-primary",
+            hx_get=full_text_url,
+            hx_target="closest span",
+            hx_swap="innerHTML"
+        ),
+    )
+
+
+def _card_field(label: str, text: str, full_text_url: str):
+    """One labelled line of card text."""
+    return air.Div(
+        air.Span(label, class_="font-bold"),
+        air.Span(*text_preview(text, full_text_url)),
+        class_="card-field"
+    )
+
+
+def _tooltip_class(prefix: str, name: str) -> str:
+    return f"tip-{prefix}-{name.lower()}"
+
+
+# Class bundles per card type, built once so rendering a card is a dict lookup
+MICE_CARD_CLASSES = {code: f"card mice-card {colors}" for code, colors in MICE_COLORS.items()}
+MICE_CODE_CLASSES = {code: f"text-lg font-bold tooltip tooltip-right {_tooltip_class('mice', code)}" for code in MICE_COLORS}
+MICE_DIAGRAM_CLASSES = {
+    code: f"border-l-4 pl-2 mb-2 {colors.replace('bg-', 'border-')}" for code, colors in MICE_COLORS.items()
+}
+TRY_CARD_CLASSES = {type: f"card try-card {colors}" for type, colors in TRY_COLORS.items()}
+TRY_TITLE_CLASSES = {type: f"font-bold tooltip {_tooltip_class('try', type)}" for type in TRY_COLORS}
+
+# The card class bundles, then tooltip text served once as CSS instead of repeated in
+# every card's data-tip. DaisyUI draws the tooltip in ::before, and some of its rules
+# only match elements that have data-tip, so cards keep an empty one; JSON string
+# escaping is valid CSS string escaping.
+CARD_STYLES_CSS = (Path(__file__).parent / "card_styles.css").read_text() + "".join(
+    f".tooltip.{_tooltip_class(prefix, name)}::before{{content:{json.dumps(text, ensure_ascii=False)}}}\n"
+    for prefix, tooltips in (("mice", MICE_TOOLTIPS), ("try", TRY_TOOLTIPS))
+    for name, text in tooltips.items()
+)
+
+
 def render_mice_card(card: MiceCard):
     """Render a single MICE card with opening, closing, and controls."""
-    def info_span(icon: str, text: str, extra_class: str = ""):
+    def info_span(icon: str, field: str):
         return air.Div(
             air.Span(icon, class_="font-bold"),
-            air.Span(text),
-            class_=f"mb-2 text-sm {extra_class}"
+            air.Span(*text_preview(getattr(card, field), f"/mice-cards/{card.id}/text/{field}")),
+            class_="mb-2 text-sm"
         )
 
     return air.Div(
         air.Div(
-            air.Span(f"{card.code}", class_="text-lg font-bold tooltip tooltip-right", data_tip=MICE_TOOLTIPS.get(card.code, "")),
+            air.Span(f"{card.code}", class_=MICE_CODE_CLASSES[card.code], data_tip=""),
             air.Span(f" Level {card.nesting_level}", class_="text-sm"),
             class_="mb-2"
         ),
-        info_span("↓ ", card.opening),
-        info_span("↑ ", card.closing),
+        info_span("↓ ", "opening"),
+        info_span("↑ ", "closing"),
         air.Div(
-            air.Button(
-                "Edit",
-                class_="btn btn-xs btn-primary mr-1",
-                hx_get=f"/mice-edit/{card.id}",
-                hx_target=f"#mice-card-{card.id}",
-                hx_swap="outerHTML"
-            ),
-            air.Button(
-                "Delete",
-                class_="btn btn-xs btn-error",
-                hx_delete=f"/mice-cards/{card.id}",
-                hx_target=f"#mice-card-{card.id}",
-                hx_swap="outerHTML"
-            ),
+            air.Button("Edit", class_="btn btn-xs btn-primary mr-1", hx_get=f"/mice-edit/{card.id}"),
+            air.Button("Delete", class_="btn btn-xs btn-error", hx_delete=f"/mice-cards/{card.id}"),
             class_="mt-2"
         ),
-        class_=f"card border-2 p-3 {MICE_COLORS[card.code]}",
-        style="height: auto; min-height: 200px;",
-        id=f"mice-card-{card.id}"
+        class_=MICE_CARD_CLASSES[card.code],
+        id=f"mice-card-{card.id}",
+        sse_swap=f"mice-card-{card.id}",
+        # Inherited by the buttons, so each one only names its request
+        hx_target="this",
+        hx_swap="outerHTML"
     )
 
 
@@ -80,53 +128,42 @@ def render_try_card(card: TryCard):
     """Render a single Try/Fail card with attempt, failure, consequence, and controls."""
     return air.Div(
         air.Div(
-            air.Span(f"{card.type} #{card.order_num}", class_="font-bold tooltip", data_tip=TRY_TOOLTIPS.get(card.type, "")),
-            class_="mb-2"
-        ),
-        air.Div(
-            air.Span("Attempt: ", class_="font-bold text-xs"),
-            air.Span(card.attempt, class_="text-xs"),
-            class_="mb-1"
-        ),
-        air.Div(
-            air.Span("Failure: ", class_="font-bold text-xs"),
-            air.Span(card.failure, class_="text-xs"),
-            class_="mb-1"
-        ),
-        air.Div(
-            air.Span("Consequence: ", class_="font-bold text-xs"),
-            air.Span(card.consequence, class_="text-xs"),
+            air.Span(f"{card.type} #{card.order_num}", class_=TRY_TITLE_CLASSES[card.type], data_tip=""),
             class_="mb-2"
         ),
+        _card_field("Attempt: ", card.attempt, f"/try-cards/{card.id}/text/attempt"),
+        _card_field("Failure: ", card.failure, f"/try-cards/{card.id}/text/failure"),
+        _card_field("Consequence: ", card.consequence, f"/try-cards/{card.id}/text/consequence"),
         air.Div(
-            air.Button(
-                "Edit",
-                class_="btn btn-xs btn-primary mr-2",
-                hx_get=f"/try-edit/{card.id}",
-                hx_target=f"#try-card-{card.id}",
-                hx_swap="outerHTML"
-            ),
+            air.Button("Edit", class_="btn btn-xs btn-primary mr-2", hx_get=f"/try-edit/{card.id}"),
             air.Button(
                 "Delete",
                 class_="btn btn-xs btn-error",
                 hx_delete=f"/try-cards/{card.id}",
                 hx_target="body",
-                hx_swap="outerHTML",
                 hx_confirm="Are you sure you want to delete this Try card?"
             ),
-            class_="flex gap-2"
+            class_="flex gap-2 mt-1"
         ),
-        class_=f"card border-2 p-3 {TRY_COLORS[card.type]}",
-        style="height: auto; max-height: 250px; overflow-auto;",
-        id=f"try-card-{card.id}"
+        class_=TRY_CARD_CLASSES[card.type],
+        id=f"try-card-{card.id}",
+        sse_swap=f"try-card-{card.id}",
+        # Inherited by the buttons, so each one only names its request
+        hx_target="this",
+        hx_swap="outerHTML"
     )
 
 
-def render_nesting_diagram(mice_cards):
-    """Render nested boxes showing MICE card structure by nesting level."""
+def render_nesting_diagram(mice_cards, issues: dict[int, list[str]] | None = None):
+    """Render nested boxes showing MICE card structure by nesting level.
+
+    Cards with structural problems (see validation.py) are annotated inline.
+    """
     if not mice_cards:
         return air.Div("No MICE cards to display", class_="text-gray-500 italic")
 
+    issues = issues or {}
+
     # Sort by nesting level
     sorted_cards = sorted(mice_cards, key=lambda c: c.nesting_level)
 
@@ -141,14 +178,15 @@ def render_nesting_diagram(mice_cards):
             ),
             air.Div(
                 air.Span("↓ ", class_="text-green-600 font-bold"),
-                air.Span(card.opening, class_="text-xs"),
+                air.Span(*text_preview(card.opening, f"/mice-cards/{card.id}/text/opening"), class_="text-xs"),
                 class_="mb-1"
             ),
             air.Div(
                 air.Span("↑ ", class_="text-purple-600 font-bold"),
-                air.Span(card.closing, class_="text-xs"),
+                air.Span(*text_preview(card.closing, f"/mice-cards/{card.id}/text/closing"), class_="text-xs"),
             ),
-            class_=f"border-l-4 pl-2 mb-2 {MICE_COLORS[card.code].replace('bg-', 'border-')}",
+            *[air.Div(f"⚠ {issue}", class_="text-xs text-error mt-1") for issue in issues.get(card.id, [])],
+            class_=MICE_DIAGRAM_CLASSES[card.code],
             style=f"margin-left: {indent}px;"
         )
 
@@ -158,51 +196,46 @@ def render_nesting_diagram(mice_cards):
     )
 
 
-def render_story_timeline(mice_cards, try_cards):
-    """Render three-act story timeline showing the complete narrative structure."""
-    sorted_mice = sorted(mice_cards, key=lambda c: c.nesting_level)
-    sorted_tries = sorted(try_cards, key=lambda c: c.order_num)
+def render_timeline_try_item(card: TryCard):
+    """Render one Try/Fail cycle as an Act 2 timeline entry."""
+    return air.Li(
+        air.Div(
+            air.Span(f"{card.type} #{card.order_num}", class_="font-bold text-sm"),
+            class_="mb-1"
+        ),
+        _card_field("Attempt: ", card.attempt, f"/try-cards/{card.id}/text/attempt"),
+        _card_field("Failure: ", card.failure, f"/try-cards/{card.id}/text/failure"),
+        _card_field("Consequence: ", card.consequence, f"/try-cards/{card.id}/text/consequence"),
+        class_="mb-3"
+    )
+
+
+def render_story_timeline(mice_cards, try_cards, act2_items: list | None = None):
+    """Render three-act story timeline showing the complete narrative structure.
+
+    act2_items replaces the Act 2 entries built from try_cards, for pages that
+    stream the Try/Fail cycles in separately.
+    """
+    sorted_mice, sorted_tries = order_outline(mice_cards, try_cards)
 
     # Act 1: MICE openings in nesting order
     act1_items = [
         air.Li(
             air.Span(f"{card.code}: ", class_="font-bold"),
-            air.Span(card.opening, class_="text-sm")
+            air.Span(*text_preview(card.opening, f"/mice-cards/{card.id}/text/opening"), class_="text-sm")
         )
         for card in sorted_mice
     ]
 
     # Act 2: Try/Fail cycles with all fields
-    act2_items = [
-        air.Li(
-            air.Div(
-                air.Span(f"{card.type} #{card.order_num}", class_="font-bold text-sm"),
-                class_="mb-1"
-            ),
-            air.Div(
-                air.Span("Attempt: ", class_="font-bold text-xs"),
-                air.Span(card.attempt, class_="text-xs"),
-                class_="mb-1"
-            ),
-            air.Div(
-                air.Span("Failure: ", class_="font-bold text-xs"),
-                air.Span(card.failure, class_="text-xs"),
-                class_="mb-1"
-            ),
-            air.Div(
-                air.Span("Consequence: ", class_="font-bold text-xs"),
-                air.Span(card.consequence, class_="text-xs")
-            ),
-            class_="mb-3"
-        )
-        for card in sorted_tries
-    ]
+    if act2_items is None:
+        act2_items = [render_timeline_try_item(card) for card in sorted_tries]
 
     # Act 3: MICE closings in reverse order
     act3_items = [
         air.Li(
             air.Span(f"{card.code}: ", class_="font-bold"),
-            air.Span(card.closing, class_="text-sm")
+            air.Span(*text_preview(card.closing, f"/mice-cards/{card.id}/text/closing"), class_="text-sm")
         )
         for card in reversed(sorted_mice)
     ]
@@ -227,6 +260,29 @@ def render_story_timeline(mice_cards, try_cards):
     )
 
 
+def render_export_status(story_id: int, story_version: int, status: str):
+    """Render the progress of an outline export, polling until the file is ready."""
+    if status == "done":
+        return air.Div(
+            air.A(
+                "Download Markdown",
+                href=f"/stories/{story_id}/exports/{story_version}/download",
+                class_="link link-primary text-sm"
+            ),
+            id="export-status"
+        )
+    if status in ("queued", "running"):
+        return air.Div(
+            air.Span(class_="loading loading-spinner loading-xs mr-2"),
+            air.Span(f"Export {status}...", class_="text-sm"),
+            id="export-status",
+            hx_get=f"/stories/{story_id}/exports/{story_version}",
+            hx_trigger="every 1s",
+            hx_swap="outerHTML"
+        )
+    return air.Div(air.Span("Export failed, try again", class_="text-sm text-error"), id="export-status")
+
+
 def render_mice_help_panel():
     """Render the MICE Quotient educational help panel with collapsible toggle."""
     return air.Div(
@@ -285,3 +341,50 @@ def render_mice_help_panel():
         ),
         class_="mb-4"
     )
+
+
+def render_templates_modal():
+    """Render the story templates selection modal dialog."""
+    return air.Dialog(
+        air.Div(
+            air.H3("Story Templates", class_="text-2xl font-bold mb-4"),
+            air.P("Choose a template to get started with a pre-built story structure:", class_="mb-4"),
+            air.Div(
+                air.Button(
+                    air.H4("🔍 Mystery", class_="text-xl font-bold mb-2"),
+                    air.P("A detective investigates a murder in a small town", class_="text-sm"),
+                    class_="btn btn-outline w-full text-left h-auto py-4 mb-3",
+                    hx_post="/load-template/mystery",
+                    hx_target="body",
+                    hx_swap="outerHTML",
+                    onclick="document.getElementById('templates-modal').close()"
+                ),
+                air.Button(
+                    air.H4("🗺️ Adventure", class_="text-xl font-bold mb-2"),
+                    air.P("A hero embarks on a quest to save their homeland", class_="text-sm"),
+                    class_="btn btn-outline w-full text-left h-auto py-4 mb-3",
+                    hx_post="/load-template/adventure",
+                    hx_target="body",
+                    hx_swap="outerHTML",
+                    onclick="document.getElementById('templates-modal').close()"
+                ),
+                air.Button(
+                    air.H4("💕 Romance", class_="text-xl font-bold mb-2"),
+                    air.P("Two people find love against all odds", class_="text-sm"),
+                    class_="btn btn-outline w-full text-left h-auto py-4 mb-3",
+                    hx_post="/load-template/romance",
+                    hx_target="body",
+                    hx_swap="outerHTML",
+                    onclick="document.getElementById('templates-modal').close()"
+                ),
+            ),
+            air.Button(
+                "Cancel",
+                class_="btn btn-ghost mt-2",
+                onclick="document.getElementById('templates-modal').close()"
+            ),
+            class_="modal-box"
+        ),
+        id="templates-modal",
+        class_="modal"
+    )
@@ -0,0 +1,66 @@
+"""Transparent compression for long card text.
+
+Writers sometimes paste whole scene drafts into a card. Text longer than
+COMPRESS_MIN_BYTES is stored deflated with a preset dictionary of typical
+story phrasing, so even a few kilobytes compress well. Shorter text is stored
+as is, so small cards stay readable in the database and cost nothing extra.
+
+Compressed values stay text, so the columns work unchanged on SQLite and
+PostgreSQL: a marker, the dictionary version, then base64 of the deflate
+stream. Text that happens to start with the marker is always compressed, so
+reading a value back is never ambiguous.
+
+SQL sees the stored form, so length() on a compressed value counts encoded
+characters rather than the original text; the card models keep each text
+field's real length in a <field>_length column for that reason.
+"""
+
+import base64
+import os
+import zlib
+from pathlib import Path
+from sqlalchemy import Text
+from sqlalchemy.types import TypeDecorator
+
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+
+MARKER = "\x01z"
+# Data written with a dictionary must always be readable with it, so
+# dictionaries are never edited; a better one is added under a new version
+DICTIONARIES = {
+    "1": (Path(__file__).parent / "compression_dictionary_v1.txt").read_bytes(),
+}
+CURRENT_DICTIONARY = "1"
+
+
+def compress_text(text: str) -> str:
+    """Encode text for storage, compressing it when it is long enough to pay off."""
+    data = text.encode()
+    if len(data) < COMPRESS_MIN_BYTES and not text.startswith(MARKER):
+        return text
+    compressor = zlib.compressobj(level=9, zdict=DICTIONARIES[CURRENT_DICTIONARY])
+    compressed = compressor.compress(data) + compressor.flush()
+    return MARKER + CURRENT_DICTIONARY + base64.b64encode(compressed).decode()
+
+
+def decompress_text(stored: str) -> str:
+    """Decode a stored value back to the original text."""
+    if not stored.startswith(MARKER):
+        return stored
+    version = stored[len(MARKER)]
+    decompressor = zlib.decompressobj(zdict=DICTIONARIES[version])
+    data = decompressor.decompress(base64.b64decode(stored[len(MARKER) + 1:]))
+    return (data + decompressor.flush()).decode()
+
+
+class CompressedText(TypeDecorator):
+    """A text column that compresses long values on the way in and restores them on the way out."""
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value: str | None, dialect) -> str | None:
+        return None if value is None else compress_text(value)
+
+    def process_result_value(self, value: str | None, dialect) -> str | None:
+        return None if value is None else decompress_text(value)
@@ -0,0 +1,236 @@
+"""Engine setup for the configured storage backend.
+
+DATABASE_URL picks the backend and defaults to the local SQLite file.
+PostgreSQL URLs get a tuned connection pool instead. Use the psycopg 3
+driver (postgresql+psycopg://...) to get server-side prepared statements.
+Install it with `uv add "psycopg[binary]"`; it is not a default dependency.
+
+Setting SHARD_DIR turns on sharding: each story's cards, undo log and version
+live in their own SQLite file in that directory, so writers on different
+stories never wait on each other's database lock. engine_for(story_id) picks
+the database for a story. At most SHARD_POOL_SIZE shard engines stay open per
+process; the least recently used is closed when another is needed. The
+story_shards table in the main database lists every shard. A story that
+already has rows in the main database is copied into its shard when the shard
+is first created. Sharding needs a SQLite DATABASE_URL for the catalog.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from pathlib import Path
+from sqlalchemy import Engine, Table, bindparam, event, insert, inspect, or_, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, SQLModel, create_engine
+from models import MiceCard, TryCard, Operation, StoryVersion, StoryShard
+from ordering import spread_keys
+
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///story_builder.db")
+SQL_ECHO = os.environ.get("SQL_ECHO", "1") == "1"
+
+# PostgreSQL pool sizing per worker process
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "20"))
+# Recycle connections before common server/proxy idle timeouts close them
+DB_POOL_RECYCLE_SECONDS = 1800
+# psycopg prepares a statement server-side after it has run this many times
+PREPARE_THRESHOLD = 5
+
+SHARD_DIR = os.environ.get("SHARD_DIR", "")
+SHARD_POOL_SIZE = int(os.environ.get("SHARD_POOL_SIZE", "32"))
+# Tables holding one story's data, which move into its shard when sharding is on
+STORY_TABLES: list[Table] = [MiceCard.__table__, TryCard.__table__, Operation.__table__, StoryVersion.__table__]
+
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    """Let several worker processes share the database file.
+
+    WAL keeps readers in other workers going while one of them writes, and
+    busy_timeout makes a second writer wait for the lock instead of failing.
+    Incremental auto-vacuum only takes effect on a new database; it lets
+    maintenance.py return free pages in small steps.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+def make_engine(url: str) -> Engine:
+    """Create an engine tuned for the backend named in the URL."""
+    if url.startswith("sqlite"):
+        engine = create_engine(url, echo=SQL_ECHO)
+        event.listen(engine, "connect", _configure_sqlite)
+        return engine
+
+    connect_args = {}
+    if url.startswith("postgresql+psycopg:"):
+        connect_args["prepare_threshold"] = PREPARE_THRESHOLD
+    return create_engine(
+        url,
+        echo=SQL_ECHO,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        # Replace connections the server dropped instead of failing the request that draws them
+        pool_pre_ping=True,
+        pool_recycle=DB_POOL_RECYCLE_SECONDS,
+        connect_args=connect_args,
+    )
+
+
+def init_db(engine: Engine, tables: list[Table] | None = None):
+    """Create missing tables, columns and indexes for the current models, or only for the given tables."""
+    tables = tables or SQLModel.metadata.sorted_tables
+    SQLModel.metadata.create_all(engine, tables=tables)
+    _add_missing_columns(engine, tables)
+    _add_missing_indexes(engine, tables)
+    _backfill_order_keys(engine)
+    _backfill_text_lengths(engine)
+
+
+def _add_missing_columns(engine: Engine, tables: list[Table]):
+    """Add model columns that an existing database predates.
+
+    create_all only creates missing tables, so columns added to a model later
+    (such as the card version) are added here with their default filled in.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(engine.dialect)
+                default = column.type.literal_processor(engine.dialect)(column.default.arg)
+                connection.execute(text(
+                    f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type} NOT NULL DEFAULT {default}"
+                ))
+
+
+
+def _add_missing_indexes(engine: Engine, tables: list[Table]):
+    """Create model indexes that an existing database predates, as create_all skips existing tables."""
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in tables:
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(connection)
+
+
+def _backfill_order_keys(engine: Engine):
+    """Give Try/Fail cards written before order keys existed a key.
+
+    A story with any unkeyed card gets fresh keys for all of its cards,
+    following order_num as the lists did before.
+    """
+    table = TryCard.__table__
+    with engine.begin() as connection:
+        story_ids = connection.scalars(select(table.c.story_id).where(table.c.order_key == "").distinct()).all()
+        for story_id in story_ids:
+            card_ids = connection.scalars(
+                select(table.c.id).where(table.c.story_id == story_id).order_by(table.c.order_num, table.c.id)
+            ).all()
+            connection.execute(
+                update(table).where(table.c.id == bindparam("card_id")).values(order_key=bindparam("key")),
+                [{"card_id": card_id, "key": key} for card_id, key in zip(card_ids, spread_keys(len(card_ids)))],
+            )
+
+
+def _backfill_text_lengths(engine: Engine):
+    """Fill the text length columns of cards written before they existed.
+
+    Stored text may be compressed, so each card is loaded to count its
+    characters; this runs once, as later writes keep the lengths current.
+    """
+    with Session(engine) as session:
+        for model in (MiceCard, TryCard):
+            unfilled = select(model).where(
+                *(getattr(model, f"{field}_length") == 0 for field in model.TEXT_FIELDS),
+                or_(*(getattr(model, field) != "" for field in model.TEXT_FIELDS)),
+            )
+            for card in session.scalars(unfilled):
+                card.sqlmodel_update({f"{field}_length": len(getattr(card, field)) for field in model.TEXT_FIELDS})
+        session.commit()
+
+
+engine = make_engine(DATABASE_URL)
+
+# Open shard engines, least recently used first
+_shards: OrderedDict[int, Engine] = OrderedDict()
+_shards_lock = threading.Lock()
+
+
+def _copy_story_from_main(story_id: int, shard: Engine):
+    """Copy a story's rows from the main database into its new shard, so turning sharding on keeps it."""
+    with engine.connect() as source, shard.begin() as target:
+        for table in STORY_TABLES:
+            rows = source.execute(select(table).where(table.c.story_id == story_id)).mappings().all()
+            if rows:
+                target.execute(insert(table), [dict(row) for row in rows])
+
+
+def _open_shard(story_id: int) -> Engine:
+    path = Path(SHARD_DIR) / f"story-{story_id}.db"
+    is_new = not path.exists()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    shard = make_engine(f"sqlite:///{path}")
+    init_db(shard, STORY_TABLES)
+    if is_new:
+        _copy_story_from_main(story_id, shard)
+    with Session(engine) as session:
+        # Several workers may open the same new shard at once; the first entry wins
+        session.exec(
+            sqlite_insert(StoryShard)
+            .values(story_id=story_id, path=str(path), created=time.time())
+            .on_conflict_do_nothing()
+        )
+        session.commit()
+    return shard
+
+
+def engine_for(story_id: int) -> Engine:
+    """Return the engine holding a story's data: its shard when sharding is on, else the main engine."""
+    if not SHARD_DIR:
+        return engine
+    with _shards_lock:
+        shard = _shards.get(story_id)
+        if shard is None:
+            shard = _shards[story_id] = _open_shard(story_id)
+            if len(_shards) > SHARD_POOL_SIZE:
+                # Sessions still using the evicted engine keep their connection until they close
+                _shards.popitem(last=False)[1].dispose()
+        _shards.move_to_end(story_id)
+        return shard
+
+
+def story_engines() -> Iterator[Engine]:
+    """Yield every database holding story data: each shard in the catalog when sharding is on, else the main one.
+
+    The main database is left out when sharding is on, since the stories
+    copied from it into their shards would otherwise count twice.
+    """
+    if not SHARD_DIR:
+        yield engine
+        return
+    with Session(engine) as session:
+        story_ids = session.scalars(select(StoryShard.story_id).order_by(StoryShard.story_id)).all()
+    for story_id in story_ids:
+        yield engine_for(story_id)
+
+
+def shard_status() -> dict:
+    """Describe the shard catalog and which shards this process has open."""
+    with Session(engine) as session:
+        catalog = session.scalars(select(StoryShard).order_by(StoryShard.story_id)).all() if SHARD_DIR else []
+    return {
+        "enabled": bool(SHARD_DIR),
+        "pool_size": SHARD_POOL_SIZE,
+        "open": list(_shards),
+        "shards": [{"story_id": shard.story_id, "path": shard.path} for shard in catalog],
+    }
@@ -1,29 +1,376 @@
 """Database operations for the Story Builder app."""
 
-from sqlmodel import Session, select
-from models import MiceCard, TryCard
+import json
+from collections.abc import Iterator
+from sqlalchemy import tuple_
+from sqlmodel import Session, SQLModel, select, delete, insert, update, func
+from models import MiceCard, TryCard, Operation, StoryVersion
+from ordering import MAX_KEY_LENGTH, key_between, spread_keys
+import cache
+import feed
+
+# Operations kept in each story's undo log; older ones are dropped by compaction
+UNDO_LOG_LIMIT = 200
+# Compact once a story has this many operations over the limit instead of on every write
+COMPACT_EVERY = 50
+
+CARD_MODELS: dict[str, type[SQLModel]] = {
+    MiceCard.__tablename__: MiceCard,
+    TryCard.__tablename__: TryCard,
+}
 
 
 # ==================== Query Functions ====================
 
+def _cache_scope(session: Session) -> str:
+    """Name of the database a session reads, which prefixes its cache keys.
+
+    Every story shard numbers its cards from 1, so a key without the
+    database would hand one story's cached cards to another.
+    """
+    return session.get_bind().url.database or ""
+
+
+def _cache_keys(session: Session, table: str, card_id: int) -> list[str]:
+    """Cache entries that hold a card: its own and its table's full list."""
+    scope = _cache_scope(session)
+    return [f"{scope}/{table}:{card_id}", f"{scope}/{table}:all"]
+
+
+# Cached rows are model_dump output of loaded cards, so model_construct rebuilds
+# them without validating again, which is most of the cost of a cache hit
 def get_all_mice_cards(session: Session) -> list[MiceCard]:
-    """Get all MICE cards from the database."""
-    return session.exec(select(MiceCard)).all()
+    """Get all MICE cards, from the read cache when it has them."""
+    rows = cache.read_through(
+        "get_all_mice_cards",
+        f"{_cache_scope(session)}/{MiceCard.__tablename__}:all",
+        lambda: [card.model_dump() for card in session.exec(select(MiceCard))]
+    )
+    return [MiceCard.model_construct(**row) for row in rows]
 
 
 def get_all_try_cards(session: Session) -> list[TryCard]:
-    """Get all Try/Fail cards from the database, ordered by order_num."""
-    return session.exec(select(TryCard).order_by(TryCard.order_num)).all()
+    """Get all Try/Fail cards in list order, from the read cache when it has them."""
+    rows = cache.read_through(
+        "get_all_try_cards",
+        f"{_cache_scope(session)}/{TryCard.__tablename__}:all",
+        lambda: [card.model_dump() for card in session.exec(select(TryCard).order_by(TryCard.order_key, TryCard.id))]
+    )
+    return [TryCard.model_construct(**row) for row in rows]
+
+
+def count_try_cards(session: Session) -> int:
+    """Count Try/Fail cards without loading them."""
+    return session.exec(select(func.count()).select_from(TryCard)).one()
+
+
+def iter_try_cards(session: Session, batch_size: int) -> Iterator[TryCard]:
+    """Stream Try/Fail cards in list order, fetching batch_size rows at a time.
+
+    The session's identity map holds cards weakly, so cards the caller has
+    finished with are freed as the iteration moves on.
+    """
+    return iter(session.exec(
+        select(TryCard).order_by(TryCard.order_key, TryCard.id).execution_options(yield_per=batch_size)
+    ))
+
+
+def page_mice_cards(session: Session, story_id: int, after_id: int | None, limit: int) -> list[MiceCard]:
+    """Get up to limit of a story's MICE cards in id order, resuming after the card after_id."""
+    query = select(MiceCard).where(MiceCard.story_id == story_id).order_by(MiceCard.id).limit(limit)
+    if after_id is not None:
+        query = query.where(MiceCard.id > after_id)
+    return list(session.exec(query))
+
+
+def page_try_cards(session: Session, story_id: int, after: tuple[str, int] | None, limit: int) -> list[TryCard]:
+    """Get up to limit of a story's Try/Fail cards in list order, resuming after the (order_key, id) cursor."""
+    query = select(TryCard).where(TryCard.story_id == story_id).order_by(TryCard.order_key, TryCard.id).limit(limit)
+    if after is not None:
+        query = query.where(tuple_(TryCard.order_key, TryCard.id) > after)
+    return list(session.exec(query))
+
+
+def get_story_cards(session: Session, story_id: int) -> tuple[list[MiceCard], list[TryCard]]:
+    """Get every card of one story."""
+    mice_cards = session.exec(select(MiceCard).where(MiceCard.story_id == story_id)).all()
+    try_cards = session.exec(select(TryCard).where(TryCard.story_id == story_id)).all()
+    return list(mice_cards), list(try_cards)
+
+
+def _get_card(session: Session, model: type[SQLModel], card_id: int) -> SQLModel | None:
+    def load() -> dict | None:
+        card = session.get(model, card_id)
+        return card.model_dump() if card else None
+
+    row = cache.read_through(
+        f"get_{model.__tablename__.removesuffix('s')}", f"{_cache_scope(session)}/{model.__tablename__}:{card_id}", load
+    )
+    return model.model_construct(**row) if row else None
 
 
 def get_mice_card(session: Session, card_id: int) -> MiceCard | None:
-    """Get a single MICE card by ID."""
-    return session.get(MiceCard, card_id)
+    """Get a single MICE card by ID, from the read cache when it has it."""
+    return _get_card(session, MiceCard, card_id)
 
 
 def get_try_card(session: Session, card_id: int) -> TryCard | None:
-    """Get a single Try/Fail card by ID."""
-    return session.get(TryCard, card_id)
+    """Get a single Try/Fail card by ID, from the read cache when it has it."""
+    return _get_card(session, TryCard, card_id)
+
+
+def get_card_version(session: Session, table: str, card_id: int) -> int | None:
+    """Get a card's stored version by primary key, or None if it is missing; skips the read cache."""
+    model = CARD_MODELS[table]
+    return session.scalar(select(model.version).where(model.id == card_id))
+
+
+def get_story_version(session: Session, story_id: int) -> int:
+    """Get the story's change counter; 0 means it has never been written."""
+    story_version = session.get(StoryVersion, story_id)
+    return story_version.version if story_version else 0
+
+
+# ==================== Operation Log ====================
+
+def _commit(session: Session, changes: list[dict], versions: dict[int, int], reload: bool = False):
+    """Commit, then drop the cache entries the changes made stale and push the changes to open pages.
+
+    With reload, open pages are told to refetch instead of getting each
+    change, for changes that reorder the list.
+    """
+    session.commit()
+    cache.invalidate(
+        key
+        for change in changes
+        for key in _cache_keys(session, change["table"], (change["after"] or change["before"])["id"])
+    )
+    if reload:
+        feed.publish([], versions)
+        for story_id in versions:
+            feed.publish_reload(story_id)
+    else:
+        feed.publish(changes, versions)
+
+
+def _text_lengths(model: type[SQLModel], values: dict) -> dict:
+    """Length columns for the text fields among values, counted in characters like SQL length()."""
+    return {f"{field}_length": len(values[field]) for field in model.TEXT_FIELDS if field in values}
+
+
+def _change(card: SQLModel, before: dict | None, after: dict | None) -> dict:
+    """Describe one card change as before/after snapshots for the operation log."""
+    return {"table": card.__tablename__, "before": before, "after": after}
+
+
+def _bump_story_versions(session: Session, changes: list[dict]) -> dict[int, int]:
+    """Advance the version of every story touched by the changes and return the new versions."""
+    versions = {}
+    for story_id in {(change["after"] or change["before"])["story_id"] for change in changes}:
+        version = session.exec(
+            update(StoryVersion)
+            .where(StoryVersion.story_id == story_id)
+            .values(version=StoryVersion.version + 1)
+            .returning(StoryVersion.version)
+        ).scalar_one_or_none()
+        if version is None:
+            version = 1
+            session.add(StoryVersion(story_id=story_id, version=version))
+        versions[story_id] = version
+    return versions
+
+
+def _log_operation(session: Session, story_id: int, action: str, changes: list[dict]) -> dict[int, int]:
+    """Append an operation to the story's log inside the caller's transaction.
+
+    A new edit invalidates whatever was undone before it in the same story,
+    so that story's redo history is dropped here. Returns the bumped story
+    versions.
+    """
+    versions = _bump_story_versions(session, changes)
+    session.exec(delete(Operation).where(Operation.story_id == story_id, Operation.undone == True))
+    operation = Operation(story_id=story_id, action=action, changes=json.dumps(changes))
+    session.add(operation)
+    session.flush()
+    logged = session.exec(select(func.count()).select_from(Operation).where(Operation.story_id == story_id)).one()
+    if logged >= UNDO_LOG_LIMIT + COMPACT_EVERY:
+        compact_operation_log(session, story_id)
+    return versions
+
+
+def compact_operation_log(session: Session, story_id: int):
+    """Drop the story's operations older than its newest UNDO_LOG_LIMIT entries."""
+    # Operation ids are shared by every story in a database, so count the story's own entries
+    oldest_kept_id = session.exec(
+        select(Operation.id).where(Operation.story_id == story_id)
+        .order_by(Operation.id.desc()).offset(UNDO_LOG_LIMIT - 1).limit(1)
+    ).first()
+    if oldest_kept_id is not None:
+        session.exec(delete(Operation).where(Operation.story_id == story_id, Operation.id < oldest_kept_id))
+
+
+def _renumber_in_log(session: Session, story_id: int, table: str, old_id: int, new_id: int):
+    """Point the story's logged snapshots of a card at the id it was re-created under."""
+    for operation in session.exec(select(Operation).where(Operation.story_id == story_id)):
+        changes = json.loads(operation.changes)
+        renumbered = False
+        for change in changes:
+            for snapshot in (change["before"], change["after"]):
+                if change["table"] == table and snapshot and snapshot["id"] == old_id:
+                    snapshot["id"] = new_id
+                    renumbered = True
+        if renumbered:
+            operation.changes = json.dumps(changes)
+
+
+def _apply_snapshot(session: Session, table: str, current: dict | None, target: dict | None) -> dict | None:
+    """Move one card row from its current snapshot to the target snapshot.
+
+    Rewritten rows get a fresh version so forms opened before the undo or
+    redo still conflict. A deleted card comes back under its old id unless
+    another card took that id meanwhile (SQLite reuses the highest rowid),
+    in which case it gets a new id and the story's log follows it. Returns
+    the row as it now stands.
+    """
+    model = CARD_MODELS[table]
+    if target is not None:
+        # Entries logged before the length columns existed do not carry them
+        target = {**target, **_text_lengths(model, target)}
+    if target is None:
+        session.delete(session.get(model, current["id"]))
+        return None
+    if current is None:
+        if session.get(model, target["id"]) is None:
+            session.add(model(**target))
+            return target
+        card = model(**{**target, "id": None})
+        session.add(card)
+        session.flush()
+        _renumber_in_log(session, target["story_id"], table, target["id"], card.id)
+        return card.model_dump()
+    card = session.get(model, target["id"])
+    card.sqlmodel_update({**target, "version": card.version + 1})
+    return card.model_dump()
+
+
+def undo(session: Session, story_id: int) -> Operation | None:
+    """Revert the story's most recent operation that has not been undone yet."""
+    operation = session.exec(
+        select(Operation).where(Operation.story_id == story_id, Operation.undone == False)
+        .order_by(Operation.id.desc()).limit(1)
+    ).first()
+    if operation:
+        changes = []
+        for change in reversed(json.loads(operation.changes)):
+            after = _apply_snapshot(session, change["table"], change["after"], change["before"])
+            changes.append({"table": change["table"], "before": change["after"], "after": after})
+            session.flush()
+        operation.undone = True
+        versions = _bump_story_versions(session, changes)
+        _commit(session, changes, versions)
+    return operation
+
+
+def redo(session: Session, story_id: int) -> Operation | None:
+    """Re-apply the story's oldest undone operation."""
+    operation = session.exec(
+        select(Operation).where(Operation.story_id == story_id, Operation.undone == True)
+        .order_by(Operation.id).limit(1)
+    ).first()
+    if operation:
+        changes = []
+        for change in json.loads(operation.changes):
+            after = _apply_snapshot(session, change["table"], change["before"], change["after"])
+            changes.append({"table": change["table"], "before": change["before"], "after": after})
+            session.flush()
+        operation.undone = False
+        versions = _bump_story_versions(session, changes)
+        _commit(session, changes, versions)
+    return operation
+
+
+# ==================== Ordering ====================
+
+def _key_after(session: Session, story_id: int, lower: str | None, exclude_id: int | None) -> str:
+    """Key that sorts right after lower (or first, for None) among the story's other Try/Fail cards."""
+    upper_query = select(func.min(TryCard.order_key)).where(TryCard.story_id == story_id, TryCard.id != exclude_id)
+    if lower is not None:
+        upper_query = upper_query.where(TryCard.order_key > lower)
+    return key_between(lower, session.exec(upper_query).one())
+
+
+def _key_for_number(session: Session, story_id: int, order_num: int, exclude_id: int | None = None) -> str:
+    """Key that places a card numbered order_num after the last card numbered the same or lower."""
+    lower = session.exec(
+        select(func.max(TryCard.order_key))
+        .where(TryCard.story_id == story_id, TryCard.id != exclude_id, TryCard.order_num <= order_num)
+    ).one()
+    return _key_after(session, story_id, lower, exclude_id)
+
+
+def _respread_keys(session: Session, story_id: int) -> list[dict]:
+    """Respread a story's order keys once repeated inserts at one spot have made them long.
+
+    The changes are left uncommitted, to go into the caller's operation. Keys
+    only order the list, so versions are left alone and open edit forms stay
+    valid.
+    """
+    cards = session.exec(
+        select(TryCard).where(TryCard.story_id == story_id).order_by(TryCard.order_key, TryCard.id)
+    ).all()
+    changes = []
+    for card, key in zip(cards, spread_keys(len(cards))):
+        if card.order_key != key:
+            before = card.model_dump()
+            card.order_key = key
+            changes.append(_change(card, before, card.model_dump()))
+    return changes
+
+
+def move_try_card(session: Session, card_id: int, after_id: int | None) -> TryCard | None:
+    """Move a Try/Fail card to just after another card, or to the front for None.
+
+    The moved card gets a key between its new neighbours, then the story's
+    cards are numbered 1, 2, 3... in list order so the labels match it; only
+    cards whose key or number changed are written, and the whole move is one
+    undo entry. Returns None when either card is missing or they belong to
+    different stories.
+    """
+    card = session.get(TryCard, card_id)
+    after = session.get(TryCard, after_id) if after_id is not None else None
+    if not card or (after_id is not None and (not after or after.story_id != card.story_id)):
+        return None
+
+    cards = session.exec(
+        select(TryCard).where(TryCard.story_id == card.story_id).order_by(TryCard.order_key, TryCard.id)
+    ).all()
+    before = {other.id: other.model_dump() for other in cards}
+    cards.remove(card)
+    position = cards.index(after) + 1 if after else 0
+    cards.insert(position, card)
+
+    lower = cards[position - 1].order_key if position > 0 else None
+    upper = cards[position + 1].order_key if position + 1 < len(cards) else None
+    key = key_between(lower, upper) if lower is None or upper is None or lower < upper else None
+    if key is not None and len(key) <= MAX_KEY_LENGTH:
+        card.order_key = key
+    else:
+        # No short key fits between the neighbours (or they share one), so respread the story
+        for other, spread_key in zip(cards, spread_keys(len(cards))):
+            other.order_key = spread_key
+    card.version += 1
+    for number, other in enumerate(cards, start=1):
+        if other.order_num != number:
+            other.order_num = number
+            if other is not card:
+                # The number shows in open edit forms, so saving one made before this must conflict
+                other.version += 1
+
+    changes = [_change(other, before[other.id], other.model_dump()) for other in cards if other.model_dump() != before[other.id]]
+    versions = _log_operation(session, card.story_id, "move_try_card", changes)
+    _commit(session, changes, versions, reload=True)
+    session.refresh(card)
+    return card
 
 
 # ==================== Create Functions ====================
@@ -40,10 +387,15 @@ def create_mice_card(
         code=code,
         opening=opening,
         closing=closing,
-        nesting_level=nesting_level
+        nesting_level=nesting_level,
+        opening_length=len(opening),
+        closing_length=len(closing)
     )
     session.add(card)
-    session.commit()
+    session.flush()
+    changes = [_change(card, None, card.model_dump())]
+    versions = _log_operation(session, card.story_id, "create_mice_card", changes)
+    _commit(session, changes, versions)
     session.refresh(card)
     return card
 
@@ -56,72 +408,147 @@ def create_try_card(
     failure: str,
     consequence: str
 ) -> TryCard:
-    """Create a new Try/Fail card and save it to the database."""
+    """Create a new Try/Fail card after the last card with the same or a lower number."""
     card = TryCard(
         type=type,
         order_num=order_num,
         attempt=attempt,
         failure=failure,
-        consequence=consequence
+        consequence=consequence,
+        attempt_length=len(attempt),
+        failure_length=len(failure),
+        consequence_length=len(consequence)
     )
+    card.order_key = _key_for_number(session, card.story_id, order_num)
+    respread = []
+    if len(card.order_key) > MAX_KEY_LENGTH:
+        respread = _respread_keys(session, card.story_id)
+        card.order_key = _key_for_number(session, card.story_id, order_num)
     session.add(card)
-    session.commit()
+    session.flush()
+    changes = [*respread, _change(card, None, card.model_dump())]
+    versions = _log_operation(session, card.story_id, "create_try_card", changes)
+    _commit(session, changes, versions, reload=bool(respread))
     session.refresh(card)
     return card
 
 
 # ==================== Update Functions ====================
 
+def _conditional_update(
+    session: Session,
+    model: type[SQLModel],
+    card_id: int,
+    version: int,
+    new_version: int,
+    values: dict
+) -> tuple[SQLModel | None, dict | None]:
+    """Write values to a card only if it is still at the expected version.
+
+    Returns the updated card and its operation-log change, or (None, None)
+    when the card is missing or was saved by someone else first.
+    """
+    before = session.get(model, card_id)
+    if not before or before.version != version:
+        return None, None
+    before = before.model_dump()
+    values = {**values, **_text_lengths(model, values)}
+    if model is TryCard and values.get("order_num", before["order_num"]) != before["order_num"]:
+        # A renumbered card moves to where its new number places it
+        values = {**values, "order_key": _key_for_number(session, before["story_id"], values["order_num"], card_id)}
+    # The version check and the write are one statement, so a concurrent save
+    # between the read above and here still loses cleanly instead of being overwritten
+    card = session.exec(
+        update(model)
+        .where(model.id == card_id, model.version == version)
+        .values(**values, version=new_version)
+        .returning(model)
+    ).scalar_one_or_none()
+    if not card:
+        return None, None
+    return card, _change(card, before, card.model_dump())
+
+
 def update_mice_card(
     session: Session,
     card_id: int,
+    version: int,
     code: str,
     opening: str,
     closing: str,
     nesting_level: int
 ) -> MiceCard | None:
-    """Update an existing MICE card."""
-    card = session.get(MiceCard, card_id)
+    """Update a MICE card if it is still at the version the editor loaded.
+
+    Returns None when the card is missing or was saved by someone else first.
+    """
+    card, change = _conditional_update(
+        session, MiceCard, card_id, version, version + 1,
+        {"code": code, "opening": opening, "closing": closing, "nesting_level": nesting_level}
+    )
     if card:
-        card.code = code
-        card.opening = opening
-        card.closing = closing
-        card.nesting_level = nesting_level
-        session.commit()
-        session.refresh(card)
+        versions = _log_operation(session, card.story_id, "update_mice_card", [change])
+        _commit(session, [change], versions)
     return card
 
 
 def update_try_card(
     session: Session,
     card_id: int,
+    version: int,
     type: str,
     order_num: int,
     attempt: str,
     failure: str,
     consequence: str
 ) -> TryCard | None:
-    """Update an existing Try/Fail card."""
-    card = session.get(TryCard, card_id)
+    """Update a Try/Fail card if it is still at the version the editor loaded.
+
+    Returns None when the card is missing or was saved by someone else first.
+    """
+    card, change = _conditional_update(
+        session, TryCard, card_id, version, version + 1,
+        {"type": type, "order_num": order_num, "attempt": attempt, "failure": failure, "consequence": consequence}
+    )
     if card:
-        card.type = type
-        card.order_num = order_num
-        card.attempt = attempt
-        card.failure = failure
-        card.consequence = consequence
-        session.commit()
-        session.refresh(card)
+        versions = _log_operation(session, card.story_id, "update_try_card", [change])
+        _commit(session, [change], versions)
     return card
 
 
+def apply_queued_updates(session: Session, updates: list[dict]) -> list[dict]:
+    """Apply a batch of coalesced card edits in one transaction.
+
+    Each update is {"table", "id", "version", "edits", "fields"}: `edits`
+    queued saves folded together, made against `version`. Every card still
+    gets its own undo entry. Returns the updates that conflicted.
+    """
+    actions = {MiceCard.__tablename__: "update_mice_card", TryCard.__tablename__: "update_try_card"}
+    changes, versions, conflicts = [], {}, []
+    for item in updates:
+        card, change = _conditional_update(
+            session, CARD_MODELS[item["table"]], item["id"], item["version"],
+            item["version"] + item["edits"], item["fields"]
+        )
+        if card:
+            versions.update(_log_operation(session, card.story_id, actions[item["table"]], [change]))
+            changes.append(change)
+        else:
+            conflicts.append(item)
+    _commit(session, changes, versions)
+    return conflicts
+
+
 # ==================== Delete Functions ====================
 
 def delete_mice_card(session: Session, card_id: int) -> bool:
     """Delete a MICE card by ID. Returns True if deleted, False if not found."""
     card = session.get(MiceCard, card_id)
     if card:
+        changes = [_change(card, card.model_dump(), None)]
+        versions = _log_operation(session, card.story_id, "delete_mice_card", changes)
         session.delete(card)
-        session.commit()
+        _commit(session, changes, versions)
         return True
     return False
 
@@ -130,35 +557,55 @@ def delete_try_card(session: Session, card_id: int) -> bool:
     """Delete a Try/Fail card by ID. Returns True if deleted, False if not found."""
     card = session.get(TryCard, card_id)
     if card:
+        changes = [_change(card, card.model_dump(), None)]
+        versions = _log_operation(session, card.story_id, "delete_try_card", changes)
         session.delete(card)
-        session.commit()
+        _commit(session, changes, versions)
         return True
     return False
 
 
-def clear_all_cards(session: Session):
-    """Delete all MICE and Try/Fail cards from the database."""
-    for card in session.exec(select(MiceCard)):
-        session.delete(card)
-    for card in session.exec(select(TryCard)):
-        session.delete(card)
-    session.commit()
+def _delete_all_cards(session: Session, story_id: int) -> list[dict]:
+    """Delete every card of a story without committing and return the changes for the log."""
+    changes = []
+    for model in (MiceCard, TryCard):
+        for card in session.scalars(delete(model).where(model.story_id == story_id).returning(model)):
+            changes.append(_change(card, card.model_dump(), None))
+    return changes
 
 
-# ==================== Template Loading ====================
+def clear_all_cards(session: Session, story_id: int):
+    """Delete all of a story's MICE and Try/Fail cards."""
+    changes = _delete_all_cards(session, story_id)
+    versions = _log_operation(session, story_id, "clear_all_cards", changes)
+    _commit(session, changes, versions)
 
-def load_template_data(
-    session: Session,
-    mice_data: list[dict],
-    try_data: list[dict]
-):
-    """Clear all cards and load template data into the database."""
-    clear_all_cards(session)
 
-    for data in mice_data:
-        session.add(MiceCard(**data))
+# ==================== Template Loading ====================
 
-    for data in try_data:
-        session.add(TryCard(**data))
+def prepare_template_rows(mice_data: list[dict], try_data: list[dict]) -> tuple[list[dict], list[dict]]:
+    """Validate template cards once and return insert-ready rows for load_template_data.
 
-    session.commit()
+    Try/Fail rows get evenly spread order keys following their numbers.
+    """
+    mice_rows = [MiceCard.model_validate(data).model_dump(exclude={"id"}) for data in mice_data]
+    try_rows = sorted(
+        (TryCard.model_validate(data).model_dump(exclude={"id"}) for data in try_data),
+        key=lambda row: row["order_num"]
+    )
+    for row, key in zip(try_rows, spread_keys(len(try_rows))):
+        row["order_key"] = key
+    return mice_rows, try_rows
+
+
+def load_template_data(session: Session, story_id: int, mice_rows: list[dict], try_rows: list[dict]):
+    """Replace a story's cards with rows from prepare_template_rows, in one INSERT per table."""
+    changes = _delete_all_cards(session, story_id)
+    for model, rows in ((MiceCard, mice_rows), (TryCard, try_rows)):
+        if rows:
+            rows = [{**row, "story_id": story_id, **_text_lengths(model, row)} for row in rows]
+            for card in session.scalars(insert(model).returning(model), rows):
+                changes.append(_change(card, None, card.model_dump()))
+
+    versions = _log_operation(session, story_id, "load_template", changes)
+    _commit(session, changes, versions)
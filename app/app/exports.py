@@ -0,0 +1,113 @@
+"""Background export of story outlines to downloadable documents.
+
+Large outlines are rendered in a process pool so request workers stay free.
+Finished files are cached on disk under the story version they were built
+from, so exporting an unchanged story again is served straight from disk and
+concurrent requests for the same version share one job.
+
+Until a job is on disk its state is kept in a status file beside where the
+export will go, so every worker reports the same status whichever one
+queued the job.
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+import outline
+
+EXPORT_DIR = Path(os.environ.get("EXPORT_DIR", "exports"))
+EXPORT_WORKERS = int(os.environ.get("EXPORT_WORKERS", "2"))
+# A job whose status has not changed for this long is taken to have died with its worker
+STALE_AFTER_SECONDS = 600
+
+# Jobs this process has in flight, keyed by job id; finished jobs are found on disk instead
+_jobs: dict[str, Future] = {}
+_pool: ProcessPoolExecutor | None = None
+
+
+def job_id(story_id: int, story_version: int) -> str:
+    return f"story-{story_id}-v{story_version}"
+
+
+def export_path(job: str) -> Path:
+    return EXPORT_DIR / f"{job}.md"
+
+
+def _status_path(job: str) -> Path:
+    return EXPORT_DIR / f"{job}.status"
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the server process has threads and open database connections
+        _pool = ProcessPoolExecutor(EXPORT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def start_export(story_id: int, story_version: int, mice_cards, try_cards) -> str:
+    """Queue a Markdown export of the story unless it is on disk or already in flight in any worker."""
+    job = job_id(story_id, story_version)
+    if export_path(job).exists() or job in _jobs:
+        return job
+
+    sorted_mice, sorted_tries = outline.order_outline(mice_cards, try_cards)
+    mice_rows = [card.model_dump() for card in sorted_mice]
+    try_rows = [card.model_dump() for card in sorted_tries]
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    if not _claim(job):
+        return job
+    future = _get_pool().submit(_export, str(_status_path(job)), str(export_path(job)), mice_rows, try_rows)
+    _jobs[job] = future
+    future.add_done_callback(lambda done: _finish(job, done))
+    return job
+
+
+def _claim(job: str) -> bool:
+    """Mark a job queued; False if another worker already has it queued or running."""
+    if job_status(job) in ("queued", "running"):
+        return False
+    _status_path(job).unlink(missing_ok=True)
+    try:
+        with _status_path(job).open("x") as status:
+            status.write("queued")
+    except FileExistsError:
+        return False
+    return True
+
+
+def _export(status_path: str, path: str, sorted_mice: list[dict], sorted_tries: list[dict]):
+    """Run in the process pool: write the export, saying it is running first."""
+    Path(status_path).write_text("running")
+    outline.write_markdown_outline(path, sorted_mice, sorted_tries)
+
+
+def _finish(job: str, future: Future):
+    _jobs.pop(job, None)
+    if future.cancelled() or future.exception() is not None:
+        _status_path(job).write_text("failed")
+    else:
+        _status_path(job).unlink(missing_ok=True)
+
+
+def job_status(job: str) -> str:
+    """Return "done", "running", "queued" or "failed", as recorded on disk by whichever worker queued the job."""
+    if export_path(job).exists():
+        return "done"
+    path = _status_path(job)
+    try:
+        # Empty between the status file being created and written
+        status = path.read_text() or "queued"
+        age = time.time() - path.stat().st_mtime
+    except FileNotFoundError:
+        return "failed"
+    if status != "failed" and age > STALE_AFTER_SECONDS:
+        return "failed"
+    return status
+
+
+def shutdown():
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
@@ -0,0 +1,149 @@
+"""Per-story change feed that pushes rendered card fragments to open pages over SSE.
+
+Mutations in db.py publish their card changes here. Each change is rendered
+once and fanned out to every subscriber of the story, so the cost of a write
+does not grow with the number of open pages beyond a queue put per subscriber.
+
+The hub lives in one worker process. When several workers share the database,
+watch_other_workers notices story versions this worker did not publish and
+tells its subscribers to reload.
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+from collections.abc import AsyncIterator, Callable
+from sqlalchemy import Engine
+from sqlmodel import Session, select
+from components import render_mice_card, render_try_card
+from models import MiceCard, TryCard, StoryVersion
+
+# Events buffered per subscriber; a client that falls this far behind is told to reload
+SUBSCRIBER_QUEUE_SIZE = 100
+# Comment lines keep idle connections open through proxies
+HEARTBEAT_SECONDS = 15
+# How often each worker checks for story changes made by other workers
+CROSS_WORKER_POLL_SECONDS = 1.0
+
+RELOAD_EVENT = b"event: reload\ndata: \n\n"
+
+_subscribers: dict[int, set[asyncio.Queue]] = defaultdict(set)
+_loops: dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+# Newest story version each subscriber has been brought up to
+_known_versions: dict[int, int] = {}
+_lock = threading.Lock()
+
+
+def format_event(name: str, data: str) -> bytes:
+    """Encode one named SSE event; every line of data needs its own prefix."""
+    lines = "".join(f"data: {line}\n" for line in data.splitlines() or [""])
+    return f"event: {name}\n{lines}\n".encode()
+
+
+def _render_change(change: dict) -> bytes:
+    """Render the fragment that brings a page up to date with one card change."""
+    if change["table"] == MiceCard.__tablename__:
+        prefix, model, render = "mice-card", MiceCard, render_mice_card
+    else:
+        prefix, model, render = "try-card", TryCard, render_try_card
+
+    before, after = change["before"], change["after"]
+    if after is None:
+        # An empty outerHTML swap removes the card from the page
+        return format_event(f"{prefix}-{before['id']}", "")
+    html = render(model(**after)).render()
+    if before is None:
+        return format_event(f"{prefix}-created", html)
+    return format_event(f"{prefix}-{after['id']}", html)
+
+
+def _deliver(queue: asyncio.Queue, event: bytes):
+    """Queue an event on the subscriber's loop, replacing a full backlog with a reload."""
+    if queue.full():
+        while not queue.empty():
+            queue.get_nowait()
+        event = RELOAD_EVENT
+    queue.put_nowait(event)
+
+
+def publish(changes: list[dict], story_versions: dict[int, int]):
+    """Push card changes to every page subscribed to the affected stories.
+
+    Safe to call from request threads; delivery happens on each subscriber's loop.
+    """
+    with _lock:
+        for story_id, version in story_versions.items():
+            _known_versions[story_id] = max(version, _known_versions.get(story_id, 0))
+        subscribers = {story_id: [(_loops[queue], queue) for queue in queues] for story_id, queues in _subscribers.items()}
+
+    for change in changes:
+        story_id = (change["after"] or change["before"])["story_id"]
+        if not subscribers.get(story_id):
+            continue
+        event = _render_change(change)
+        for loop, queue in subscribers[story_id]:
+            loop.call_soon_threadsafe(_deliver, queue, event)
+
+
+def publish_reload(story_id: int):
+    """Tell every page of a story to refetch itself."""
+    with _lock:
+        deliveries = [(_loops[queue], queue) for queue in _subscribers.get(story_id, ())]
+    for loop, queue in deliveries:
+        loop.call_soon_threadsafe(_deliver, queue, RELOAD_EVENT)
+
+
+def _read_story_versions(engine_for: Callable[[int], Engine], story_ids: list[int]) -> dict[int, int]:
+    # Stories sharing a database are read together; with sharding each has its own
+    story_ids_by_engine = defaultdict(list)
+    for story_id in story_ids:
+        story_ids_by_engine[engine_for(story_id)].append(story_id)
+    versions = {}
+    for engine, ids in story_ids_by_engine.items():
+        with Session(engine) as session:
+            rows = session.exec(select(StoryVersion).where(StoryVersion.story_id.in_(ids))).all()
+            versions.update({row.story_id: row.version for row in rows})
+    return versions
+
+
+async def watch_other_workers(engine_for: Callable[[int], Engine]):
+    """Reload subscribers whose story was changed by another worker process.
+
+    Runs for the life of the worker. The first sighting of a story only records
+    its version, since a page that just subscribed was rendered from it.
+    engine_for gives the database holding each story.
+    """
+    while True:
+        await asyncio.sleep(CROSS_WORKER_POLL_SECONDS)
+        with _lock:
+            story_ids = list(_subscribers)
+        if not story_ids:
+            continue
+        versions = await asyncio.to_thread(_read_story_versions, engine_for, story_ids)
+        for story_id, version in versions.items():
+            with _lock:
+                known = _known_versions.setdefault(story_id, version)
+                if version > known:
+                    _known_versions[story_id] = version
+            if version > known:
+                publish_reload(story_id)
+
+
+async def stream(story_id: int) -> AsyncIterator[bytes]:
+    """Yield SSE events for one subscriber until the client disconnects."""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    with _lock:
+        _subscribers[story_id].add(queue)
+        _loops[queue] = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                yield await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+            except TimeoutError:
+                yield b": heartbeat\n\n"
+    finally:
+        with _lock:
+            _subscribers[story_id].discard(queue)
+            if not _subscribers[story_id]:
+                del _subscribers[story_id]
+            del _loops[queue]
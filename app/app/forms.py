@@ -1,8 +1,10 @@
 """Form builders for MICE and Try/Fail cards."""
 
+import html
+from string import Template
 import air
 from models import MiceCard, TryCard
-from components import MICE_COLORS
+from components import MICE_COLORS, TRY_COLORS
 
 
 def _form_field(label: str, input_element):
@@ -55,24 +57,18 @@ def _mice_edit_form(card: MiceCard) -> air.Form:
                 class_="input input-bordered w-full mb-1"
             )
         ),
+        air.Input(type="hidden", name="version", value=str(card.version)),
         air.Button(
             "Save",
             type="submit",
             class_="btn btn-success btn-xs mr-2"
         ),
-        air.Button(
-            "Cancel",
-            type="button",
-            class_="btn btn-ghost btn-xs",
-            hx_get=f"/mice-card/{card.id}",
-            hx_target=f"#mice-card-{card.id}",
-            hx_swap="outerHTML"
-        ),
+        # Cancel inherits the form's target and swap
+        air.Button("Cancel", type="button", class_="btn btn-ghost btn-xs", hx_get=f"/mice-card/{card.id}"),
         hx_put=f"/mice-cards/{card.id}",
-        hx_target=f"#mice-card-{card.id}",
+        hx_target="this",
         hx_swap="outerHTML",
-        class_=f"card border-2 p-3 {MICE_COLORS[card.code]} overflow-auto",
-        style="width: 100%; height: auto; min-height: 200px;",
+        class_=f"card mice-card {MICE_COLORS[card.code]} overflow-auto w-full",
         id=f"mice-card-{card.id}"
     )
 
@@ -198,27 +194,21 @@ def _try_edit_form(card: TryCard) -> air.Form:
                 rows="1"
             )
         ),
+        air.Input(type="hidden", name="version", value=str(card.version)),
         air.Div(
             air.Button(
                 "Save",
                 type="submit",
                 class_="btn btn-success btn-xs mr-2"
             ),
-            air.Button(
-                "Cancel",
-                type="button",
-                class_="btn btn-ghost btn-xs",
-                hx_get=f"/try-card/{card.id}",
-                hx_target=f"#try-card-{card.id}",
-                hx_swap="outerHTML"
-            ),
+            # Cancel inherits the form's target and swap
+            air.Button("Cancel", type="button", class_="btn btn-ghost btn-xs", hx_get=f"/try-card/{card.id}"),
             class_="mt-2"
         ),
         hx_put=f"/try-cards/{card.id}",
-        hx_target=f"#try-card-{card.id}",
+        hx_target="this",
         hx_swap="outerHTML",
-        class_="card bg-base-100 shadow-lg p-2",
-        style="height: auto;",
+        class_="card bg-base-100 shadow-lg p-2 h-auto",
         id=f"try-card-{card.id}"
     )
 
@@ -301,3 +291,66 @@ def try_card_form(card: TryCard | None = None) -> air.Form:
         return _try_edit_form(card)
     else:
         return _try_create_form()
+
+
+# ==================== Prerendered Forms ====================
+# The create forms never vary, and the edit forms only vary in a few card
+# fields, so both are rendered once at import instead of rebuilt per request.
+
+MICE_CREATE_FORM_HTML = _mice_create_form().render()
+TRY_CREATE_FORM_HTML = _try_create_form().render()
+
+
+# One template per type, since the selected option and card colors depend on it.
+# air escapes text children but not attribute values, so the ${field}
+# placeholders survive rendering and text fields are escaped on substitution.
+_MICE_EDIT_TEMPLATES = {
+    code: Template(_mice_edit_form(MiceCard(
+        id="${id}",
+        version="${version}",
+        code=code,
+        opening="${opening}",
+        closing="${closing}",
+        nesting_level="${nesting_level}"
+    )).render())
+    for code in MICE_COLORS
+}
+_TRY_EDIT_TEMPLATES = {
+    type: Template(_try_edit_form(TryCard(
+        id="${id}",
+        version="${version}",
+        type=type,
+        order_num="${order_num}",
+        attempt="${attempt}",
+        failure="${failure}",
+        consequence="${consequence}"
+    )).render())
+    for type in TRY_COLORS
+}
+
+
+def mice_edit_form_html(card: MiceCard) -> str:
+    """Render the MICE edit form; same output as mice_card_form(card)."""
+    return _MICE_EDIT_TEMPLATES[card.code].substitute(
+        id=card.id,
+        version=card.version,
+        opening=html.escape(card.opening),
+        closing=html.escape(card.closing),
+        nesting_level=card.nesting_level
+    )
+
+
+def try_edit_form_html(card: TryCard) -> str:
+    """Render the Try edit form; same output as try_card_form(card)."""
+    template = _TRY_EDIT_TEMPLATES.get(card.type)
+    if template is None:
+        # A type with no template (say, one stored before the list changed) still gets a form
+        return try_card_form(card).render()
+    return template.substitute(
+        id=card.id,
+        version=card.version,
+        order_num=card.order_num,
+        attempt=html.escape(card.attempt),
+        failure=html.escape(card.failure),
+        consequence=html.escape(card.consequence)
+    )
@@ -1,5 +1,19 @@
+import html
+import json
 import air
 
+# htmx's default response handling, plus swapping 409 Conflict bodies so a
+# rejected save shows the card as the other editor left it
+HTMX_CONFIG = {
+    "responseHandling": [
+        {"code": "204", "swap": False},
+        {"code": "[23]..", "swap": True},
+        {"code": "409", "swap": True},
+        {"code": "[45]..", "swap": False, "error": True},
+        {"code": "...", "swap": False},
+    ]
+}
+
 def story_builder_layout(*children):
     """Custom layout for Story Builder app."""
     # Separate head and body content
@@ -11,11 +25,14 @@ def story_builder_layout(*children):
         air.Head(
             air.Meta(charset="utf-8"),
             air.Meta(name="viewport", content="width=device-width, initial-scale=1"),
-            air.Link(href="https://cdn.jsdelivr.net/npm/daisyui@latest/dist/full.css", rel="stylesheet", type="text/css"),
+            air.Meta(name="htmx-config", content=html.escape(json.dumps(HTMX_CONFIG))),
+            # Pinned: card tooltips override DaisyUI 4's ::before content, and 5 has no full.css
+            air.Link(href="https://cdn.jsdelivr.net/npm/daisyui@4.12.24/dist/full.css", rel="stylesheet", type="text/css"),
             air.Script(src="https://cdn.jsdelivr.net/npm/@tailwindcss/browser@4"),
             air.Script(
                 src="https://unpkg.com/htmx.org@2.0.7"
             ),
+            air.Script(src="https://unpkg.com/htmx-ext-sse@2.2.2/sse.js"),
             *head_tags
         ),
         air.Body(
@@ -1,280 +1,668 @@
+import asyncio
+import hashlib
+import html
+import os
+from itertools import batched
+from typing import Literal
+from collections.abc import Callable, Iterator
+from contextlib import asynccontextmanager
 import air
-from fastapi import Form, Response
-from sqlmodel import SQLModel, Session, create_engine
+from fastapi import Form, Query, Request, Response
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from sqlmodel import Session
 from models import MiceCard, TryCard
 from layouts import story_builder_layout
 from templates import TEMPLATES
-from components import render_mice_card, render_try_card, render_nesting_diagram, render_story_timeline, render_mice_help_panel
+from components import (
+    render_mice_card,
+    render_try_card,
+    render_nesting_diagram,
+    render_story_timeline,
+    render_timeline_try_item,
+    render_export_status,
+    render_mice_help_panel,
+    render_templates_modal,
+    CARD_STYLES_CSS,
+)
+import api
+import cache
 import db
-from forms import mice_card_form, try_card_form
+import exports
+from database import engine, engine_for, init_db, shard_status, story_engines
+import feed
+import maintenance
+from outline import order_outline, outline_data
+import stats
+import traffic
+import validation
+import write_behind
+from forms import MICE_CREATE_FORM_HTML, TRY_CREATE_FORM_HTML, mice_edit_form_html, try_edit_form_html
+
+# Database setup (backend chosen by DATABASE_URL, see database.py)
+init_db(engine)
+
+@asynccontextmanager
+async def lifespan(app: air.Air):
+    """Run the background tasks for as long as this worker serves requests."""
+    watcher = asyncio.create_task(feed.watch_other_workers(engine_for))
+    if write_behind.ENABLED:
+        write_behind.start(engine_for)
+    if maintenance.ENABLED:
+        maintenance.start(engine)
+    yield
+    if maintenance.ENABLED:
+        maintenance.stop()
+    if write_behind.ENABLED:
+        write_behind.stop()
+    exports.shutdown()
+    watcher.cancel()
+
+app = air.Air(lifespan=lifespan)
+
+
+@app.middleware("http")
+async def flush_queued_edits(request: Request, call_next):
+    """Commit queued card saves before anything that reads or writes around them.
+
+    Card saves (PUT) are the only requests that join the write-behind queue;
+    everything else must see them applied, in order.
+    """
+    if request.method != "PUT" and write_behind.has_pending():
+        await asyncio.to_thread(write_behind.flush)
+    return await call_next(request)
+
+
+# Registered after flush_queued_edits so it runs first and rejected requests cost nothing
+@app.middleware("http")
+async def rate_limit_mutations(request: Request, call_next):
+    """Turn away clients that send mutations faster than their token bucket refills.
+
+    Clients are told apart by IP address, so everyone behind one NAT or proxy
+    (a classroom, say) shares a single bucket; raise MUTATION_RATE for that.
+    """
+    client = request.client.host if request.client else "unknown"
+    if request.method in ("POST", "PUT", "DELETE") and not traffic.take_token(client):
+        return Response(status_code=429, headers={"Retry-After": "1"})
+    return await call_next(request)
+
+# The app edits a single story until story selection exists
+STORY_ID = 1
+
+# Prerendered fragments only change on deploy, and the page links them by a URL
+# versioned with their content hash, so a versioned URL can be cached this long
+STATIC_FRAGMENT_MAX_AGE = 86400
+
+
+def _etag(content: str) -> str:
+    return '"' + hashlib.sha256(content.encode()).hexdigest()[:16] + '"'
+
+
+def _versioned_url(path: str, etag: str) -> str:
+    """URL of a prerendered fragment that changes whenever its content does."""
+    return f"{path}?v={etag.strip('"')}"
+
+
+def _cached_fragment(request: Request, html: str, etag: str, media_type: str = "text/html") -> Response:
+    """Serve a prerendered fragment with browser caching, or 304 if the browser has it.
+
+    Only the URL carrying the current version is cached outright; any other
+    request must revalidate its ETag, so a deploy is never hidden behind an
+    old copy.
+    """
+    if request.query_params.get("v") == etag.strip('"'):
+        cache_control = f"public, max-age={STATIC_FRAGMENT_MAX_AGE}"
+    else:
+        cache_control = "no-cache"
+    headers = {"Cache-Control": cache_control, "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=html, media_type=media_type, headers=headers)
+
+
+MICE_CREATE_FORM_ETAG = _etag(MICE_CREATE_FORM_HTML)
+MICE_FORM_URL = _versioned_url("/mice-form", MICE_CREATE_FORM_ETAG)
+TRY_CREATE_FORM_ETAG = _etag(TRY_CREATE_FORM_HTML)
+TRY_FORM_URL = _versioned_url("/try-form", TRY_CREATE_FORM_ETAG)
+
+# Page chrome built only from constants, fetched by the page after it loads
+HELP_PANEL_HTML = render_mice_help_panel().render()
+HELP_PANEL_ETAG = _etag(HELP_PANEL_HTML)
+HELP_PANEL_URL = _versioned_url("/fragments/help-panel", HELP_PANEL_ETAG)
+CARD_STYLES_ETAG = _etag(CARD_STYLES_CSS)
+CARD_STYLES_URL = _versioned_url("/styles/cards.css", CARD_STYLES_ETAG)
+TEMPLATES_MODAL_HTML = render_templates_modal().render()
+TEMPLATES_MODAL_ETAG = _etag(TEMPLATES_MODAL_HTML)
+TEMPLATES_MODAL_URL = _versioned_url("/fragments/templates-modal", TEMPLATES_MODAL_ETAG)
+
+# Templates validated once at startup, so loading one only copies rows
+TEMPLATE_ROWS = {
+    name: db.prepare_template_rows(template["mice_cards"], template["try_cards"])
+    for name, template in TEMPLATES.items()
+}
+
+
+# Stories with more Try/Fail cards than this are streamed instead of rendered whole
+STREAM_RENDER_THRESHOLD = int(os.environ.get("STREAM_RENDER_THRESHOLD", "2000"))
+# Cards fetched from the database and sent to the browser per chunk while streaming
+STREAM_BATCH_SIZE = 500
+# Placeholders marking where streamed Try/Fail cards go in the page shell
+_TRY_LIST_SLOT = "<!--try-cards-->"
+_TIMELINE_SLOT = "<!--timeline-try-cards-->"
 
-# Database setup
-DATABASE_URL = "sqlite:///story_builder.db"
-engine = create_engine(DATABASE_URL, echo=True)
 
-def init_db():
-    SQLModel.metadata.create_all(engine)
+def _read_story_size() -> tuple[int, int]:
+    with Session(engine_for(STORY_ID)) as session:
+        return db.get_story_version(session, STORY_ID), db.count_try_cards(session)
 
-# Initialize database on startup
-init_db()
 
-app = air.Air()
+async def _run_in_session[T](story_id: int, operation: Callable[..., T], *args) -> T:
+    """Run a db function in a session on the story's database, off the event loop."""
+    def run() -> T:
+        with Session(engine_for(story_id)) as session:
+            return operation(session, *args)
 
+    return await asyncio.to_thread(run)
 
-def _templates_modal():
-    """Render the story templates selection modal dialog."""
-    return air.Dialog(
-        air.Div(
-            air.H3("Story Templates", class_="text-2xl font-bold mb-4"),
-            air.P("Choose a template to get started with a pre-built story structure:", class_="mb-4"),
-            air.Div(
-                air.Button(
-                    air.H4("🔍 Mystery", class_="text-xl font-bold mb-2"),
-                    air.P("A detective investigates a murder in a small town", class_="text-sm"),
-                    class_="btn btn-outline w-full text-left h-auto py-4 mb-3",
-                    hx_post="/load-template/mystery",
-                    hx_target="body",
-                    hx_swap="outerHTML",
-                    onclick="document.getElementById('templates-modal').close()"
-                ),
-                air.Button(
-                    air.H4("🗺️ Adventure", class_="text-xl font-bold mb-2"),
-                    air.P("A hero embarks on a quest to save their homeland", class_="text-sm"),
-                    class_="btn btn-outline w-full text-left h-auto py-4 mb-3",
-                    hx_post="/load-template/adventure",
-                    hx_target="body",
-                    hx_swap="outerHTML",
-                    onclick="document.getElementById('templates-modal').close()"
-                ),
-                air.Button(
-                    air.H4("💕 Romance", class_="text-xl font-bold mb-2"),
-                    air.P("Two people find love against all odds", class_="text-sm"),
-                    class_="btn btn-outline w-full text-left h-auto py-4 mb-3",
-                    hx_post="/load-template/romance",
-                    hx_target="body",
-                    hx_swap="outerHTML",
-                    onclick="document.getElementById('templates-modal').close()"
-                ),
-            ),
-            air.Button(
-                "Cancel",
-                class_="btn btn-ghost mt-2",
-                onclick="document.getElementById('templates-modal').close()"
-            ),
-            class_="modal-box"
-        ),
-        id="templates-modal",
-        class_="modal"
+
+@app.get("/")
+async def index():
+    """Render the story page, sharing one render among concurrent requests for the same version.
+
+    Very large stories are streamed instead, so memory use stays flat however
+    many Try/Fail cards they hold.
+    """
+    story_version, try_card_count = await asyncio.to_thread(_read_story_size)
+    if try_card_count > STREAM_RENDER_THRESHOLD:
+        return StreamingResponse(stream_index(story_version), media_type="text/html")
+    return await traffic.coalesce(
+        ("index", STORY_ID, story_version),
+        lambda: asyncio.to_thread(_render_index, story_version)
     )
 
 
-@app.get("/")
-def index():
-    with Session(engine) as session:
+def _render_index(story_version: int) -> str:
+    with Session(engine_for(STORY_ID)) as session:
         mice_cards = db.get_all_mice_cards(session)
         try_cards = db.get_all_try_cards(session)
+        nesting_issues = validation.validate_story(STORY_ID, story_version, mice_cards)
+        return _index_page(
+            mice_cards,
+            nesting_issues,
+            [render_try_card(card) for card in try_cards],
+            render_story_timeline(mice_cards, try_cards),
+        )
 
-        return story_builder_layout(
-            air.Title("Story Builder"),
+
+def stream_index(story_version: int) -> Iterator[str]:
+    """Yield the story page in chunks, holding one batch of Try/Fail cards at a time.
+
+    The page shell is rendered with placeholders where the two Try/Fail lists
+    go, then each list is filled from its own batched query.
+    """
+    with Session(engine_for(STORY_ID)) as session:
+        mice_cards = db.get_all_mice_cards(session)
+        nesting_issues = validation.validate_story(STORY_ID, story_version, mice_cards)
+        page = _index_page(
+            mice_cards,
+            nesting_issues,
+            [air.Raw(_TRY_LIST_SLOT)],
+            render_story_timeline(mice_cards, [], act2_items=[air.Raw(_TIMELINE_SLOT)]),
+        )
+        before_list, rest = page.split(_TRY_LIST_SLOT)
+        between_lists, after_timeline = rest.split(_TIMELINE_SLOT)
+        del page, rest
+
+        yield before_list
+        for batch in batched(db.iter_try_cards(session, STREAM_BATCH_SIZE), STREAM_BATCH_SIZE):
+            yield "".join(render_try_card(card).render() for card in batch)
+        yield between_lists
+        for batch in batched(db.iter_try_cards(session, STREAM_BATCH_SIZE), STREAM_BATCH_SIZE):
+            yield "".join(render_timeline_try_item(card).render() for card in batch)
+        yield after_timeline
+
+
+def _index_page(mice_cards, nesting_issues: dict[int, list[str]], try_card_items: list, story_timeline) -> str:
+    return story_builder_layout(
+        air.Title("Story Builder"),
+        air.Link(href=CARD_STYLES_URL, rel="stylesheet", type="text/css"),
+        air.Div(
+            air.Button(
+                "Templates",
+                class_="btn btn-info mr-2",
+                onclick="document.getElementById('templates-modal').showModal()"
+            ),
+            air.Button(
+                "Undo",
+                class_="btn btn-outline mr-2",
+                hx_post="/undo"
+            ),
+            air.Button(
+                "Redo",
+                class_="btn btn-outline mr-2",
+                hx_post="/redo"
+            ),
+            air.Button(
+                "Clear All Data",
+                class_="btn btn-error",
+                hx_post="/clear-data",
+                hx_target="body",
+                hx_swap="outerHTML",
+                hx_confirm="Are you sure you want to delete all cards? You can restore them with Undo."
+            ),
+            class_="mb-4"
+        ),
+        air.Div(hx_get=TEMPLATES_MODAL_URL, hx_trigger="load", hx_swap="outerHTML"),
+        air.Div(hx_get=HELP_PANEL_URL, hx_trigger="load", hx_swap="outerHTML"),
+        air.Div(
             air.Div(
+                air.H2("MICE Cards", class_="text-2xl font-bold mb-4"),
                 air.Button(
-                    "Templates",
-                    class_="btn btn-info mr-2",
-                    onclick="document.getElementById('templates-modal').showModal()"
+                    "Add MICE Card",
+                    class_="btn btn-primary mb-3",
+                    hx_get=MICE_FORM_URL,
+                    hx_target="#mice-form-container",
+                    hx_swap="innerHTML"
                 ),
-                air.Button(
-                    "Clear All Data",
-                    class_="btn btn-error",
-                    hx_post="/clear-data",
-                    hx_target="body",
-                    hx_swap="outerHTML",
-                    hx_confirm="Are you sure you want to delete all cards? This cannot be undone."
+                air.Div(id="mice-form-container"),
+                air.Div(
+                    *[render_mice_card(card) for card in mice_cards],
+                    class_="flex flex-col gap-3",
+                    id="mice-cards-list",
+                    sse_swap="mice-card-created",
+                    hx_swap="beforeend"
                 ),
-                class_="mb-4"
+                class_="border border-base-300 p-4"
             ),
-            _templates_modal(),
-            render_mice_help_panel(),
             air.Div(
+                air.H2("Try/Fail Cycles", class_="text-2xl font-bold mb-4"),
+                air.Button(
+                    "Add Try Card",
+                    class_="btn btn-primary mb-3",
+                    hx_get=TRY_FORM_URL,
+                    hx_target="#try-form-container",
+                    hx_swap="innerHTML"
+                ),
+                air.Div(id="try-form-container"),
                 air.Div(
-                    air.H2("MICE Cards", class_="text-2xl font-bold mb-4"),
-                    air.Button(
-                        "Add MICE Card",
-                        class_="btn btn-primary mb-3",
-                        hx_get="/mice-form",
-                        hx_target="#mice-form-container",
-                        hx_swap="innerHTML"
-                    ),
-                    air.Div(id="mice-form-container"),
-                    air.Div(
-                        *[render_mice_card(card) for card in mice_cards],
-                        class_="flex flex-col gap-3",
-                        id="mice-cards-list"
-                    ),
-                    class_="border border-base-300 p-4"
+                    *try_card_items,
+                    class_="flex flex-col gap-3",
+                    id="try-cards-list",
+                    sse_swap="try-card-created",
+                    hx_swap="beforeend"
                 ),
+                class_="border border-base-300 p-4"
+            ),
+            air.Div(
                 air.Div(
-                    air.H2("Try/Fail Cycles", class_="text-2xl font-bold mb-4"),
+                    air.H2("Generated Outline", class_="text-2xl font-bold"),
                     air.Button(
-                        "Add Try Card",
-                        class_="btn btn-primary mb-3",
-                        hx_get="/try-form",
-                        hx_target="#try-form-container",
-                        hx_swap="innerHTML"
-                    ),
-                    air.Div(id="try-form-container"),
-                    air.Div(
-                        *[render_try_card(card) for card in try_cards],
-                        class_="flex flex-col gap-3",
-                        id="try-cards-list"
+                        "Export Markdown",
+                        class_="btn btn-sm btn-outline",
+                        hx_post=f"/stories/{STORY_ID}/exports",
+                        hx_target="#export-status",
+                        hx_swap="outerHTML"
                     ),
-                    class_="border border-base-300 p-4"
+                    class_="flex justify-between items-center mb-4"
                 ),
-                air.Div(
-                    air.H2("Generated Outline", class_="text-2xl font-bold mb-4"),
-                    air.H3("Nesting Structure", class_="text-lg font-semibold mb-2"),
-                    render_nesting_diagram(mice_cards),
-                    air.H3("Story Timeline", class_="text-lg font-semibold mb-2 mt-6"),
-                    render_story_timeline(mice_cards, try_cards),
-                    class_="border border-base-300 p-4"
-                ),
-                class_="grid grid-cols-3 gap-4 w-full"
-            )
+                air.Div(id="export-status"),
+                air.H3("Nesting Structure", class_="text-lg font-semibold mb-2"),
+                render_nesting_diagram(mice_cards, nesting_issues),
+                air.H3("Story Timeline", class_="text-lg font-semibold mb-2 mt-6"),
+                story_timeline,
+                class_="border border-base-300 p-4"
+            ),
+            # Refetch the whole page when the change feed says this one fell too far behind
+            air.Div(hx_get="/", hx_trigger="sse:reload", hx_target="body", hx_swap="outerHTML"),
+            class_="grid grid-cols-3 gap-4 w-full",
+            hx_ext="sse",
+            sse_connect=f"/stories/{STORY_ID}/feed"
         )
+    )
+
+
+@app.get("/stories/{story_id}/feed")
+async def story_feed(story_id: int):
+    """Stream rendered card changes for a story as server-sent events."""
+    return air.SSEResponse(feed.stream(story_id))
+
+
+def _queue_export(story_id: int) -> tuple[int, str]:
+    with Session(engine_for(story_id)) as session:
+        story_version = db.get_story_version(session, story_id)
+        job = exports.start_export(story_id, story_version, *db.get_story_cards(session, story_id))
+    return story_version, exports.job_status(job)
+
+
+@app.post("/stories/{story_id}/exports")
+async def start_export(story_id: int):
+    """Queue a Markdown export of the story as it is now."""
+    story_version, status = await asyncio.to_thread(_queue_export, story_id)
+    return render_export_status(story_id, story_version, status)
+
+
+@app.get("/stories/{story_id}/exports/{story_version}")
+async def export_status(story_id: int, story_version: int):
+    job = exports.job_id(story_id, story_version)
+    return render_export_status(story_id, story_version, await asyncio.to_thread(exports.job_status, job))
+
+
+@app.get("/stories/{story_id}/exports/{story_version}/download")
+async def download_export(story_id: int, story_version: int):
+    path = exports.export_path(exports.job_id(story_id, story_version))
+    if not await asyncio.to_thread(path.exists):
+        return Response(status_code=404, content="Export not found")
+    return FileResponse(path, media_type="text/markdown", filename=f"story-outline-v{story_version}.md")
+
+
+@app.get("/stats")
+async def all_stats():
+    """Structure statistics rolled up across every story."""
+    return JSONResponse(await asyncio.to_thread(lambda: stats.rollup_stats(story_engines())))
+
+
+@app.get("/admin/maintenance")
+async def maintenance_status():
+    """Last run and next due time of each database maintenance task."""
+    return JSONResponse(await asyncio.to_thread(maintenance.status, engine))
+
+
+@app.get("/admin/shards")
+async def shards():
+    """The per-story database catalog and the shards open in this worker."""
+    return JSONResponse(await asyncio.to_thread(shard_status))
+
+
+@app.get("/admin/cache")
+def cache_metrics():
+    """Hit rates of the card read cache in this worker."""
+    return JSONResponse(cache.metrics())
+
+
+def _story_stats(session: Session, story_id: int) -> dict:
+    return stats.story_stats(session, story_id, db.get_story_version(session, story_id))
+
+
+@app.get("/stories/{story_id}/stats")
+async def story_stats(story_id: int):
+    """Structure statistics for one story: MICE code mix, depth, Try/Fail type mix and text lengths."""
+    return JSONResponse(await _run_in_session(story_id, _story_stats, story_id))
+
+
+@app.get("/api/v1/stories/{story_id}/mice-cards")
+async def api_mice_cards(
+    request: Request,
+    story_id: int,
+    fields: str | None = None,
+    after: str | None = None,
+    limit: int = Query(api.DEFAULT_PAGE_SIZE, ge=1, le=api.MAX_PAGE_SIZE)
+):
+    """A page of the story's MICE cards as JSON, in id order."""
+    selected = api.parse_fields(fields, api.MICE_FIELDS)
+    after_id = api.parse_mice_cursor(after)
+
+    def respond(session: Session) -> Response:
+        story_version = db.get_story_version(session, story_id)
+        return api.respond(request, story_version, lambda: {
+            "story_id": story_id,
+            "version": story_version,
+            **api.page(db.page_mice_cards(session, story_id, after_id, limit + 1), limit, selected, api.mice_cursor),
+        })
+
+    return await _run_in_session(story_id, respond)
+
+
+@app.get("/api/v1/stories/{story_id}/try-cards")
+async def api_try_cards(
+    request: Request,
+    story_id: int,
+    fields: str | None = None,
+    after: str | None = None,
+    limit: int = Query(api.DEFAULT_PAGE_SIZE, ge=1, le=api.MAX_PAGE_SIZE)
+):
+    """A page of the story's Try/Fail cards as JSON, in list order."""
+    selected = api.parse_fields(fields, api.TRY_FIELDS)
+    after_key = api.parse_try_cursor(after)
+
+    def respond(session: Session) -> Response:
+        story_version = db.get_story_version(session, story_id)
+        return api.respond(request, story_version, lambda: {
+            "story_id": story_id,
+            "version": story_version,
+            **api.page(db.page_try_cards(session, story_id, after_key, limit + 1), limit, selected, api.try_cursor),
+        })
+
+    return await _run_in_session(story_id, respond)
+
+
+@app.get("/api/v1/stories/{story_id}/outline")
+async def api_outline(request: Request, story_id: int):
+    """The story outline as JSON, ordered like the timeline and the Markdown export."""
+    def respond(session: Session) -> Response:
+        story_version = db.get_story_version(session, story_id)
+
+        def build() -> dict:
+            sorted_mice, sorted_tries = order_outline(*db.get_story_cards(session, story_id))
+            return {
+                "story_id": story_id,
+                "version": story_version,
+                **outline_data([card.model_dump() for card in sorted_mice], [card.model_dump() for card in sorted_tries]),
+            }
+
+        return api.respond(request, story_version, build)
+
+    return await _run_in_session(story_id, respond)
+
+
+@app.get("/styles/cards.css")
+def card_styles(request: Request):
+    return _cached_fragment(request, CARD_STYLES_CSS, CARD_STYLES_ETAG, media_type="text/css")
+
+
+@app.get("/fragments/help-panel")
+def help_panel(request: Request):
+    return _cached_fragment(request, HELP_PANEL_HTML, HELP_PANEL_ETAG)
+
+
+@app.get("/fragments/templates-modal")
+def templates_modal(request: Request):
+    return _cached_fragment(request, TEMPLATES_MODAL_HTML, TEMPLATES_MODAL_ETAG)
 
 
 @app.get("/mice-form")
-def mice_form():
-    return mice_card_form()
+def mice_form(request: Request):
+    return _cached_fragment(request, MICE_CREATE_FORM_HTML, MICE_CREATE_FORM_ETAG)
 
 @app.get("/clear-form")
 def clear_form():
     return ""
 
 @app.get("/try-form")
-def try_form():
-    return try_card_form()
+def try_form(request: Request):
+    return _cached_fragment(request, TRY_CREATE_FORM_HTML, TRY_CREATE_FORM_ETAG)
 
 @app.get("/clear-try-form")
 def clear_try_form():
     return ""
 
 @app.post("/try-cards")
-def create_try_card(
+async def create_try_card(
     type: str = Form(...),
     order_num: int = Form(...),
     attempt: str = Form(...),
     failure: str = Form(...),
     consequence: str = Form(...)
 ):
-    with Session(engine) as session:
-        db.create_try_card(session, type, order_num, attempt, failure, consequence)
+    await _run_in_session(STORY_ID, db.create_try_card, type, order_num, attempt, failure, consequence)
 
     return Response(status_code=200, headers={"HX-Redirect": "/"})
 
 
 @app.post("/clear-data")
-def clear_data():
-    with Session(engine) as session:
-        db.clear_all_cards(session)
+async def clear_data():
+    await _run_in_session(STORY_ID, db.clear_all_cards, STORY_ID)
+
+    return Response(status_code=200, headers={"HX-Redirect": "/"})
+
+@app.post("/undo")
+async def undo():
+    """Revert the most recent change to the story."""
+    await _run_in_session(STORY_ID, db.undo, STORY_ID)
+
+    return Response(status_code=200, headers={"HX-Redirect": "/"})
+
+@app.post("/redo")
+async def redo():
+    """Re-apply the most recently undone change."""
+    await _run_in_session(STORY_ID, db.redo, STORY_ID)
 
     return Response(status_code=200, headers={"HX-Redirect": "/"})
 
 @app.post("/load-template/{template_name}")
-def load_template(template_name: str):
+async def load_template(template_name: str):
     """Load a story template from templates.py into the database."""
-    if template_name not in TEMPLATES:
+    if template_name not in TEMPLATE_ROWS:
         return Response(status_code=404, content=f"Template '{template_name}' not found")
 
-    template = TEMPLATES[template_name]
+    mice_rows, try_rows = TEMPLATE_ROWS[template_name]
 
-    with Session(engine) as session:
-        db.load_template_data(session, template["mice_cards"], template["try_cards"])
+    await _run_in_session(STORY_ID, db.load_template_data, STORY_ID, mice_rows, try_rows)
 
     return Response(status_code=200, headers={"HX-Redirect": "/"})
 
 @app.get("/mice-edit/{card_id}")
-def mice_edit(card_id: int):
-    with Session(engine) as session:
-        card = db.get_mice_card(session, card_id)
-        if not card:
-            return ""
-        return mice_card_form(card)
+async def mice_edit(card_id: int):
+    card = await _run_in_session(STORY_ID, db.get_mice_card, card_id)
+    if not card:
+        return ""
+    return mice_edit_form_html(card)
 
 @app.get("/mice-card/{card_id}")
-def mice_card(card_id: int):
-    with Session(engine) as session:
-        card = db.get_mice_card(session, card_id)
-        if not card:
-            return ""
-        return render_mice_card(card)
+async def mice_card(card_id: int):
+    card = await _run_in_session(STORY_ID, db.get_mice_card, card_id)
+    if not card:
+        return ""
+    return render_mice_card(card)
+
+@app.get("/mice-cards/{card_id}/text/{field}")
+async def mice_card_text(card_id: int, field: Literal["opening", "closing"]):
+    """Full text of a MICE card field whose preview was expanded."""
+    card = await _run_in_session(STORY_ID, db.get_mice_card, card_id)
+    if not card:
+        return ""
+    return html.escape(getattr(card, field))
 
 @app.put("/mice-cards/{card_id}")
-def update_mice_card(
+async def update_mice_card(
     card_id: int,
+    version: int = Form(...),
     code: str = Form(...),
     opening: str = Form(...),
     closing: str = Form(...),
     nesting_level: int = Form(...)
 ):
-    with Session(engine) as session:
-        card = db.update_mice_card(session, card_id, code, opening, closing, nesting_level)
+    fields = {"code": code, "opening": opening, "closing": closing, "nesting_level": nesting_level}
+    return await asyncio.to_thread(_save_mice_card, card_id, version, fields)
+
+
+def _save_mice_card(card_id: int, version: int, fields: dict) -> Response | str:
+    if write_behind.ENABLED:
+        if write_behind.enqueue(MiceCard.__tablename__, STORY_ID, card_id, version, fields):
+            return Response(status_code=200, headers={"HX-Redirect": "/"})
+        write_behind.flush()
+
+    with Session(engine_for(STORY_ID)) as session:
+        card = None
+        if not write_behind.ENABLED:
+            card = db.update_mice_card(session, card_id, version, **fields)
         if not card:
-            return ""
+            current = db.get_mice_card(session, card_id)
+            if not current:
+                return ""
+            # Someone else saved first: show their version instead of overwriting it
+            return Response(status_code=409, content=render_mice_card(current).render())
 
     return Response(status_code=200, headers={"HX-Redirect": "/"})
 
 @app.delete("/mice-cards/{card_id}")
-def delete_mice_card(card_id: int):
-    with Session(engine) as session:
-        db.delete_mice_card(session, card_id)
+async def delete_mice_card(card_id: int):
+    await _run_in_session(STORY_ID, db.delete_mice_card, card_id)
     return ""
 
 @app.post("/mice-cards")
-def create_mice_card(
+async def create_mice_card(
     code: str = Form(...),
     opening: str = Form(...),
     closing: str = Form(...),
     nesting_level: int = Form(...)
 ):
-    with Session(engine) as session:
-        db.create_mice_card(session, code, opening, closing, nesting_level)
+    await _run_in_session(STORY_ID, db.create_mice_card, code, opening, closing, nesting_level)
 
     return Response(status_code=200, headers={"HX-Redirect": "/"})
 
 @app.get("/try-edit/{card_id}")
-def try_edit(card_id: int):
-    with Session(engine) as session:
-        card = db.get_try_card(session, card_id)
-        if not card:
-            return ""
-        return try_card_form(card)
+async def try_edit(card_id: int):
+    card = await _run_in_session(STORY_ID, db.get_try_card, card_id)
+    if not card:
+        return ""
+    return try_edit_form_html(card)
 
 @app.get("/try-card/{card_id}")
-def get_try_card(card_id: int):
-    with Session(engine) as session:
-        card = db.get_try_card(session, card_id)
-        if not card:
-            return ""
-        return render_try_card(card)
+async def get_try_card(card_id: int):
+    card = await _run_in_session(STORY_ID, db.get_try_card, card_id)
+    if not card:
+        return ""
+    return render_try_card(card)
+
+@app.get("/try-cards/{card_id}/text/{field}")
+async def try_card_text(card_id: int, field: Literal["attempt", "failure", "consequence"]):
+    """Full text of a Try/Fail card field whose preview was expanded."""
+    card = await _run_in_session(STORY_ID, db.get_try_card, card_id)
+    if not card:
+        return ""
+    return html.escape(getattr(card, field))
 
 @app.put("/try-cards/{card_id}")
-def update_try_card(
+async def update_try_card(
     card_id: int,
+    version: int = Form(...),
     type: str = Form(...),
     order_num: int = Form(...),
     attempt: str = Form(...),
     failure: str = Form(...),
     consequence: str = Form(...)
 ):
-    with Session(engine) as session:
-        card = db.update_try_card(session, card_id, type, order_num, attempt, failure, consequence)
+    fields = {"type": type, "order_num": order_num, "attempt": attempt, "failure": failure, "consequence": consequence}
+    return await asyncio.to_thread(_save_try_card, card_id, version, fields)
+
+
+def _save_try_card(card_id: int, version: int, fields: dict) -> Response | str:
+    if write_behind.ENABLED:
+        if write_behind.enqueue(TryCard.__tablename__, STORY_ID, card_id, version, fields):
+            # Acknowledge with the stored card as it will be once the queue is flushed
+            with Session(engine_for(STORY_ID)) as session:
+                card = db.get_try_card(session, card_id)
+            return render_try_card(card.model_copy(update={**fields, "version": version + 1})).render()
+        write_behind.flush()
+
+    with Session(engine_for(STORY_ID)) as session:
+        card = None
+        if not write_behind.ENABLED:
+            card = db.update_try_card(session, card_id, version, **fields)
         if card:
             return render_try_card(card).render()
+        current = db.get_try_card(session, card_id)
+        if current:
+            # Someone else saved first: show their version instead of overwriting it
+            return Response(status_code=409, content=render_try_card(current).render())
     return ""
 
 @app.delete("/try-cards/{card_id}")
-def delete_try_card(card_id: int):
-    with Session(engine) as session:
-        db.delete_try_card(session, card_id)
+async def delete_try_card(card_id: int):
+    await _run_in_session(STORY_ID, db.delete_try_card, card_id)
     return Response(status_code=200, headers={"HX-Redirect": "/"})
 
+
+@app.post("/try-cards/{card_id}/move")
+async def move_try_card(card_id: int, after_id: int | None = Form(None)):
+    await _run_in_session(STORY_ID, db.move_try_card, card_id, after_id)
+    return Response(status_code=200, headers={"HX-Redirect": "/"})
@@ -0,0 +1,210 @@
+"""Background upkeep for the SQLite database.
+
+A scheduler thread runs four tasks on their own intervals:
+
+- checkpoint: a PASSIVE WAL checkpoint, which never waits on readers or writers
+- incremental_vacuum: returns free pages left by clears and template reloads;
+  databases created before incremental auto-vacuum are skipped until
+  enable_incremental_vacuum (python -m maintenance) converts them
+- optimize: PRAGMA optimize, which refreshes planner statistics when stale
+- backup: an online copy through the SQLite backup API into BACKUP_DIR
+
+Each task runs on the main database and, when sharding is on, on every story
+shard listed in its story_shards table; backups are named after the file they
+copy. Vacuum and backup work in small steps with pauses in between, so request
+transactions get the database between steps instead of waiting for a whole
+pass. The tasks use their own connections, outside the request pool.
+
+Last runs are recorded in the maintenance_tasks table, so intervals hold across
+restarts and every worker can report status. Run the scheduler in one process:
+serve.py runs it in the parent and turns it off in the workers.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from datetime import datetime
+from pathlib import Path
+from sqlalchemy import Engine
+from sqlmodel import Session, select
+from models import MaintenanceTask, StoryShard
+
+ENABLED = os.environ.get("MAINTENANCE", "1") == "1"
+INTERVAL_SECONDS = {
+    "checkpoint": float(os.environ.get("MAINTENANCE_CHECKPOINT_SECONDS", "60")),
+    "incremental_vacuum": float(os.environ.get("MAINTENANCE_VACUUM_SECONDS", "600")),
+    "optimize": float(os.environ.get("MAINTENANCE_OPTIMIZE_SECONDS", "3600")),
+    "backup": float(os.environ.get("MAINTENANCE_BACKUP_SECONDS", "86400")),
+}
+BACKUP_DIR = Path(os.environ.get("BACKUP_DIR", "backups"))
+BACKUP_KEEP = int(os.environ.get("BACKUP_KEEP", "7"))
+
+# Step sizes and the pause between steps that keep each task out of the way of requests
+VACUUM_PAGES_PER_STEP = 64
+# PRAGMA auto_vacuum value of incremental mode
+INCREMENTAL = 2
+BACKUP_PAGES_PER_STEP = 256
+STEP_PAUSE_SECONDS = 0.05
+# Bounds the rows PRAGMA optimize samples per index, so it finishes in milliseconds
+ANALYSIS_LIMIT = 400
+
+_stop = threading.Event()
+_thread: threading.Thread | None = None
+
+
+def _checkpoint(connection: sqlite3.Connection):
+    connection.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+
+def _incremental_vacuum(connection: sqlite3.Connection):
+    if connection.execute("PRAGMA auto_vacuum").fetchone()[0] != INCREMENTAL:
+        # Created before incremental mode; left alone until enable_incremental_vacuum converts it
+        return
+    while connection.execute("PRAGMA freelist_count").fetchone()[0] and not _stop.is_set():
+        # Each page freed is a step of the pragma, so the rows must be read for it to run
+        connection.execute(f"PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP})").fetchall()
+        time.sleep(STEP_PAUSE_SECONDS)
+
+
+def _optimize(connection: sqlite3.Connection):
+    connection.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT}")
+    connection.execute("PRAGMA optimize")
+
+
+def _backup(connection: sqlite3.Connection):
+    BACKUP_DIR.mkdir(parents=True, exist_ok=True)
+    # Named after the database file, so the main database and each shard keep their own series
+    name = Path(connection.execute("PRAGMA database_list").fetchone()[2]).stem
+    target_path = BACKUP_DIR / f"{name}-{datetime.now():%Y%m%d-%H%M%S}.db"
+    partial_path = target_path.with_name(target_path.name + ".partial")
+    target = sqlite3.connect(partial_path)
+    connection.backup(target, pages=BACKUP_PAGES_PER_STEP, sleep=STEP_PAUSE_SECONDS)
+    target.close()
+    partial_path.replace(target_path)
+    for old in sorted(BACKUP_DIR.glob(f"{name}-*.db"))[:-BACKUP_KEEP]:
+        old.unlink()
+
+
+TASKS = {
+    "checkpoint": _checkpoint,
+    "incremental_vacuum": _incremental_vacuum,
+    "optimize": _optimize,
+    "backup": _backup,
+}
+
+
+def _last_runs(engine: Engine) -> dict[str, MaintenanceTask]:
+    with Session(engine) as session:
+        return {task.name: task for task in session.exec(select(MaintenanceTask)).all()}
+
+
+def _record(engine: Engine, name: str, started: float, error: str):
+    with Session(engine) as session:
+        task = session.get(MaintenanceTask, name) or MaintenanceTask(name=name)
+        task.runs += 1
+        task.last_finished = time.time()
+        task.last_duration_seconds = round(task.last_finished - started, 3)
+        task.last_error = error
+        session.add(task)
+        session.commit()
+
+
+def _due_at(name: str, last_runs: dict[str, MaintenanceTask]) -> float:
+    task = last_runs.get(name)
+    return (task.last_finished if task else 0) + INTERVAL_SECONDS[name]
+
+
+def _database_paths(engine: Engine) -> list[str]:
+    """The main database file, then every story shard it lists (none unless sharding is on)."""
+    with Session(engine) as session:
+        shard_paths = session.exec(select(StoryShard.path).order_by(StoryShard.story_id)).all()
+    return [engine.url.database, *shard_paths]
+
+
+def _run_task(engine: Engine, task) -> str:
+    """Run a task on every database; return the errors, one per database that failed."""
+    errors = []
+    for path in _database_paths(engine):
+        if _stop.is_set():
+            break
+        connection = sqlite3.connect(path, isolation_level=None)
+        try:
+            connection.execute("PRAGMA busy_timeout=5000")
+            task(connection)
+        except sqlite3.Error:
+            # Recorded for the status endpoint; the other databases still get the task
+            errors.append(f"{path}: {traceback.format_exc(limit=1)}")
+        finally:
+            connection.close()
+    return "".join(errors)
+
+
+def _run(engine: Engine):
+    while not _stop.is_set():
+        last_runs = _last_runs(engine)
+        for name, task in TASKS.items():
+            if _stop.is_set() or time.time() < _due_at(name, last_runs):
+                continue
+            started = time.time()
+            # The scheduler keeps going after errors and retries next interval
+            _record(engine, name, started, _run_task(engine, task))
+        last_runs = _last_runs(engine)
+        _stop.wait(max(1.0, min(_due_at(name, last_runs) for name in TASKS) - time.time()))
+
+
+def start(engine: Engine):
+    """Start the scheduler for a SQLite engine; other backends maintain themselves."""
+    global _thread
+    if engine.dialect.name != "sqlite" or (_thread and _thread.is_alive()):
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_run, args=(engine,), name="maintenance", daemon=True)
+    _thread.start()
+
+
+def stop():
+    _stop.set()
+    if _thread:
+        _thread.join()
+
+
+def enable_incremental_vacuum(engine: Engine):
+    """Switch databases created before incremental auto-vacuum over to it.
+
+    Each database still in another mode gets a full VACUUM, which rewrites
+    the file and holds the write lock until it is done, so run this with the
+    app stopped: uv run python -m maintenance
+    """
+    for path in _database_paths(engine):
+        connection = sqlite3.connect(path, isolation_level=None)
+        try:
+            if connection.execute("PRAGMA auto_vacuum").fetchone()[0] != INCREMENTAL:
+                connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                connection.execute("VACUUM")
+                print(f"{path}: switched to incremental auto-vacuum")
+        finally:
+            connection.close()
+
+
+if __name__ == "__main__":
+    from database import engine
+    enable_incremental_vacuum(engine)
+
+
+def status(engine: Engine) -> dict:
+    """Describe each task's last run and when it is next due."""
+    last_runs = _last_runs(engine)
+    tasks = {}
+    for name in TASKS:
+        task = last_runs.get(name)
+        tasks[name] = {
+            "interval_seconds": INTERVAL_SECONDS[name],
+            "runs": task.runs if task else 0,
+            "last_finished": datetime.fromtimestamp(task.last_finished).isoformat() if task else None,
+            "last_duration_seconds": task.last_duration_seconds if task else None,
+            "last_error": task.last_error if task else "",
+            "next_due": datetime.fromtimestamp(_due_at(name, last_runs)).isoformat(),
+        }
+    return {"running_in_this_process": bool(_thread and _thread.is_alive()), "tasks": tasks}
@@ -1,22 +1,89 @@
+from typing import ClassVar
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
+from compression import CompressedText
 
 class MiceCard(SQLModel, table=True):
     __tablename__ = "mice_cards"
+    # Statistics group a story's cards by code
+    __table_args__ = (Index("ix_mice_cards_story_id_code", "story_id", "code"),)
+    # Text fields whose character count db.py keeps in a <field>_length column
+    TEXT_FIELDS: ClassVar[tuple[str, ...]] = ("opening", "closing")
 
     id: int | None = Field(default=None, primary_key=True)
     story_id: int = Field(default=1)
     code: str = Field(max_length=1)
-    opening: str
-    closing: str
+    opening: str = Field(sa_type=CompressedText)
+    closing: str = Field(sa_type=CompressedText)
     nesting_level: int
+    # Bumped on every update so concurrent edits can detect each other
+    version: int = Field(default=1)
+    # Stored text may be compressed, so statistics average these instead of length()
+    opening_length: int = Field(default=0)
+    closing_length: int = Field(default=0)
 
 class TryCard(SQLModel, table=True):
     __tablename__ = "try_cards"
+    # Statistics group a story's cards by type; lists read a story's cards in order_key order
+    __table_args__ = (
+        Index("ix_try_cards_story_id_type", "story_id", "type"),
+        Index("ix_try_cards_story_id_order_key", "story_id", "order_key"),
+    )
+    # Text fields whose character count db.py keeps in a <field>_length column
+    TEXT_FIELDS: ClassVar[tuple[str, ...]] = ("attempt", "failure", "consequence")
 
     id: int | None = Field(default=None, primary_key=True)
     story_id: int = Field(default=1)
     type: str
-    attempt: str
-    failure: str
-    consequence: str
+    attempt: str = Field(sa_type=CompressedText)
+    failure: str = Field(sa_type=CompressedText)
+    consequence: str = Field(sa_type=CompressedText)
+    # The number shown on the card; list position comes from order_key
     order_num: int
+    # Fractional key from ordering.py, so moving a card rewrites only that card
+    order_key: str = Field(default="")
+    # Bumped on every update so concurrent edits can detect each other
+    version: int = Field(default=1)
+    # Stored text may be compressed, so statistics average these instead of length()
+    attempt_length: int = Field(default=0)
+    failure_length: int = Field(default=0)
+    consequence_length: int = Field(default=0)
+
+class Operation(SQLModel, table=True):
+    __tablename__ = "operations"
+    # Undo and redo read one story's log, newest or oldest first
+    __table_args__ = (Index("ix_operations_story_id_undone_id", "story_id", "undone", "id"),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    story_id: int = Field(default=1)
+    action: str
+    # JSON list of {"table", "before", "after"} card snapshots; None marks a missing row
+    changes: str = Field(sa_type=CompressedText)
+    undone: bool = Field(default=False, index=True)
+
+class StoryVersion(SQLModel, table=True):
+    __tablename__ = "story_versions"
+
+    # Bumped in the same transaction as every card change, so caches can key on it
+    story_id: int = Field(primary_key=True)
+    version: int = Field(default=0)
+
+class MaintenanceTask(SQLModel, table=True):
+    __tablename__ = "maintenance_tasks"
+
+    # Last run of each maintenance.py task, shared by every worker process
+    name: str = Field(primary_key=True)
+    runs: int = Field(default=0)
+    # Unix time, so the scheduler can compare it with time.time() directly
+    last_finished: float = Field(default=0)
+    last_duration_seconds: float = Field(default=0)
+    last_error: str = Field(default="")
+
+class StoryShard(SQLModel, table=True):
+    __tablename__ = "story_shards"
+
+    # Catalog of per-story database files, kept in the main database when SHARD_DIR is set
+    story_id: int = Field(primary_key=True)
+    path: str
+    # Unix time the shard was created
+    created: float = Field(default=0)
@@ -0,0 +1,59 @@
+"""Fractional order keys for Try/Fail cards.
+
+A key is a base-36 fraction written without the leading "0." (so "i" is 0.5),
+compared as a plain string. There is always a key between any two others, so
+moving or inserting a card writes only that card's key. Keys never end in "0",
+which keeps string order and numeric order the same.
+
+Keys grow by about one character per five inserts at the same spot. Once a
+key would pass MAX_KEY_LENGTH the story is rebalanced onto short, evenly
+spread keys. Only lowercase letters and digits are used, so the order is the
+same under byte-wise and locale collations.
+"""
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+MAX_KEY_LENGTH = 24
+
+
+def key_between(lower: str | None, upper: str | None) -> str:
+    """Return a key that sorts after lower and before upper; None leaves that end open.
+
+    Appending and prepending step one digit past the end card instead of
+    halving the gap, since cards are added at the ends far more than between.
+    """
+    appending = upper is None and lower is not None
+    prepending = lower is None and upper is not None
+    lower = lower or ""
+    key = ""
+    position = 0
+    while True:
+        low = DIGITS.index(lower[position]) if position < len(lower) else 0
+        high = DIGITS.index(upper[position]) if upper is not None else len(DIGITS)
+        if high - low > 1:
+            if appending:
+                return key + DIGITS[low + 1]
+            if prepending:
+                return key + DIGITS[high - 1]
+            return key + DIGITS[(low + high) // 2]
+        key += DIGITS[low]
+        if high - low == 1:
+            # The key is now below upper whatever follows, so only lower still bounds it
+            upper = None
+        position += 1
+
+
+def spread_keys(count: int) -> list[str]:
+    """Return count ascending keys spaced evenly, as short as the count allows."""
+    width = 1
+    while len(DIGITS) ** width <= count:
+        width += 1
+    step = len(DIGITS) ** width // (count + 1)
+    keys = []
+    for index in range(1, count + 1):
+        value = index * step
+        digits = ""
+        for _ in range(width):
+            value, digit = divmod(value, len(DIGITS))
+            digits = DIGITS[digit] + digits
+        keys.append(digits.rstrip("0"))
+    return keys
@@ -0,0 +1,65 @@
+"""Story outline ordering and document export.
+
+The HTML timeline and exported documents share order_outline, so a download
+always lists cards in the same order as the page. The writers here run in
+export worker processes, so this module only imports the standard library.
+"""
+
+from pathlib import Path
+
+
+def order_outline(mice_cards, try_cards) -> tuple[list, list]:
+    """Order cards for the outline: MICE threads by nesting level, Try/Fail cycles by order key."""
+    sorted_mice = sorted(mice_cards, key=lambda c: c.nesting_level)
+    sorted_tries = sorted(try_cards, key=lambda c: (c.order_key, c.id))
+    return sorted_mice, sorted_tries
+
+
+def outline_data(sorted_mice: list[dict], sorted_tries: list[dict]) -> dict:
+    """The outline as plain data, with the same sections and order as outline_markdown."""
+    return {
+        "nesting": [
+            {key: card[key] for key in ("id", "code", "nesting_level", "opening", "closing")}
+            for card in sorted_mice
+        ],
+        "act_1": [{"id": card["id"], "code": card["code"], "text": card["opening"]} for card in sorted_mice],
+        "act_2": [
+            {key: card[key] for key in ("id", "type", "order_num", "attempt", "failure", "consequence")}
+            for card in sorted_tries
+        ],
+        "act_3": [{"id": card["id"], "code": card["code"], "text": card["closing"]} for card in reversed(sorted_mice)],
+    }
+
+
+def outline_markdown(sorted_mice: list[dict], sorted_tries: list[dict]) -> str:
+    """Render an already ordered outline as Markdown."""
+    lines = ["# Story Outline", "", "## Nesting Structure", ""]
+    for card in sorted_mice:
+        indent = "  " * max(card["nesting_level"] - 1, 0)
+        lines.append(f"{indent}- **{card['code']}** (level {card['nesting_level']}): {card['opening']} → {card['closing']}")
+
+    lines += ["", "## Act 1: Setup", ""]
+    lines += [f"- **{card['code']}:** {card['opening']}" for card in sorted_mice]
+
+    lines += ["", "## Act 2: Confrontation", ""]
+    for card in sorted_tries:
+        lines += [
+            f"### {card['type']} #{card['order_num']}",
+            "",
+            f"- **Attempt:** {card['attempt']}",
+            f"- **Failure:** {card['failure']}",
+            f"- **Consequence:** {card['consequence']}",
+            "",
+        ]
+
+    lines += ["## Act 3: Resolution", ""]
+    lines += [f"- **{card['code']}:** {card['closing']}" for card in reversed(sorted_mice)]
+    return "\n".join(lines) + "\n"
+
+
+def write_markdown_outline(path: str, sorted_mice: list[dict], sorted_tries: list[dict]):
+    """Write the Markdown outline to path, atomically so readers never see a partial file."""
+    target = Path(path)
+    partial = target.with_name(target.name + ".partial")
+    partial.write_text(outline_markdown(sorted_mice, sorted_tries), encoding="utf-8")
+    partial.replace(target)
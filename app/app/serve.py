@@ -0,0 +1,40 @@
+"""Run Story Builder with several uvicorn worker processes sharing story_builder.db.
+
+Usage: uv run python serve.py --workers 4
+
+Each worker keeps its own in-process state (SSE subscribers, validation cache).
+That state is keyed on the story_versions table or watched through it, so a
+change made by one worker reaches pages served by the others.
+
+Database maintenance runs once, in this parent process, rather than in every
+worker. The in-process read cache is turned off in the workers, since a
+worker's cache would not see the others' writes; a shared Redis cache
+(CACHE_BACKEND=redis) stays on.
+"""
+
+import argparse
+import os
+import uvicorn
+import maintenance
+
+# Creates the tables once here, before the workers start and race to do it
+import main
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Serve Story Builder with multiple worker processes.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    if maintenance.ENABLED:
+        maintenance.start(main.engine)
+        # Workers inherit the environment and read it on import
+        os.environ["MAINTENANCE"] = "0"
+    if args.workers > 1 and os.environ.get("CACHE_BACKEND", "lru") == "lru":
+        os.environ["CACHE_BACKEND"] = "none"
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers, log_level="warning")
+
+
+if __name__ == "__main__":
+    run()
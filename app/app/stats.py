@@ -0,0 +1,140 @@
+"""Structure statistics for stories, aggregated in SQL.
+
+Counts, depths and text lengths come from GROUP BY queries over the
+(story_id, code) and (story_id, type) indexes, so a dashboard never loads card
+text into Python. Results are cached until the story version changes.
+Sums can come back as Decimal on PostgreSQL, so averages are converted to float
+before they reach the JSON response.
+
+Text lengths are averaged from the <field>_length columns db.py fills on
+every write, since the stored text of a long body is compressed (see
+compression.py) and SQL length() would count its encoded form.
+
+The rollup across stories queries each story database on its own (every
+shard when sharding is on) for counts and length sums, which add up across
+databases where averages would not, and combines them.
+"""
+
+from collections.abc import Iterable
+from sqlalchemy import Engine, func
+from sqlmodel import Session, select
+from models import MiceCard, TryCard, StoryVersion
+
+# Latest result per story as (story version, stats)
+_story_cache: dict[int, tuple[int, dict]] = {}
+# Rollup part per database, keyed by (story count, sum of story versions), which changes with any write
+_rollup_cache: dict[str, tuple[tuple[int, int], dict]] = {}
+
+
+def _mice_rows(session: Session, story_id: int | None):
+    query = select(
+        MiceCard.code,
+        func.count(),
+        func.max(MiceCard.nesting_level),
+        func.sum(MiceCard.opening_length),
+        func.sum(MiceCard.closing_length),
+    ).group_by(MiceCard.code)
+    if story_id is not None:
+        query = query.where(MiceCard.story_id == story_id)
+    return session.exec(query).all()
+
+
+def _try_rows(session: Session, story_id: int | None):
+    query = select(
+        TryCard.type,
+        func.count(),
+        func.sum(TryCard.attempt_length),
+        func.sum(TryCard.failure_length),
+        func.sum(TryCard.consequence_length),
+    ).group_by(TryCard.type)
+    if story_id is not None:
+        query = query.where(TryCard.story_id == story_id)
+    return session.exec(query).all()
+
+
+def _totals(session: Session, story_id: int | None) -> dict:
+    """Count, depth and text length sums per MICE code and Try/Fail type, for one story or the whole database."""
+    return {
+        "mice_codes": {code: list(totals) for code, *totals in _mice_rows(session, story_id)},
+        "try_types": {type: list(totals) for type, *totals in _try_rows(session, story_id)},
+    }
+
+
+def _add_totals(into: dict, totals: dict):
+    for code, (count, depth, opening, closing) in totals["mice_codes"].items():
+        known = into["mice_codes"].setdefault(code, [0, 0, 0, 0])
+        known[:] = [known[0] + count, max(known[1], depth), known[2] + opening, known[3] + closing]
+    for type, sums in totals["try_types"].items():
+        known = into["try_types"].setdefault(type, [0, 0, 0, 0])
+        known[:] = [total + added for total, added in zip(known, sums)]
+
+
+def _aggregate(totals: dict) -> dict:
+    """Turn totals into code and type distributions with average text lengths."""
+    mice_total = sum(count for count, *_ in totals["mice_codes"].values())
+    try_total = sum(count for count, *_ in totals["try_types"].values())
+    return {
+        "mice_cards": mice_total,
+        "max_nesting_level": max((depth for _, depth, *_ in totals["mice_codes"].values()), default=0),
+        "mice_codes": {
+            code: {
+                "count": count,
+                "share": round(count / mice_total, 3),
+                "avg_opening_length": round(float(opening) / count, 1),
+                "avg_closing_length": round(float(closing) / count, 1),
+            }
+            for code, (count, _, opening, closing) in totals["mice_codes"].items()
+        },
+        "try_cards": try_total,
+        "try_types": {
+            type: {
+                "count": count,
+                "share": round(count / try_total, 3),
+                "avg_attempt_length": round(float(attempt) / count, 1),
+                "avg_failure_length": round(float(failure) / count, 1),
+                "avg_consequence_length": round(float(consequence) / count, 1),
+            }
+            for type, (count, attempt, failure, consequence) in totals["try_types"].items()
+        },
+    }
+
+
+def story_stats(session: Session, story_id: int, story_version: int) -> dict:
+    """Statistics for one story, reused while the story is unchanged."""
+    cached = _story_cache.get(story_id)
+    if cached and cached[0] == story_version:
+        return cached[1]
+    stats = {"story_id": story_id, "version": story_version, **_aggregate(_totals(session, story_id))}
+    _story_cache[story_id] = (story_version, stats)
+    return stats
+
+
+def _database_totals(engine: Engine) -> dict:
+    """Totals of one database plus its story count and summed story depth, reused while it is unchanged."""
+    with Session(engine) as session:
+        key = tuple(session.exec(select(func.count(), func.coalesce(func.sum(StoryVersion.version), 0))).one())
+        cached = _rollup_cache.get(str(engine.url))
+        if cached and cached[0] == key:
+            return cached[1]
+
+        depths = (
+            select(func.max(MiceCard.nesting_level).label("depth"))
+            .group_by(MiceCard.story_id)
+            .subquery()
+        )
+        stories, depth_sum = session.exec(select(func.count(), func.coalesce(func.sum(depths.c.depth), 0))).one()
+        totals = {"stories": stories, "depth_sum": depth_sum, **_totals(session, None)}
+    _rollup_cache[str(engine.url)] = (key, totals)
+    return totals
+
+
+def rollup_stats(engines: Iterable[Engine]) -> dict:
+    """Statistics across every story in the given databases, plus how deep stories nest on average."""
+    rollup = {"stories": 0, "depth_sum": 0, "mice_codes": {}, "try_types": {}}
+    for engine in engines:
+        totals = _database_totals(engine)
+        rollup["stories"] += totals["stories"]
+        rollup["depth_sum"] += totals["depth_sum"]
+        _add_totals(rollup, totals)
+    avg_depth = float(rollup["depth_sum"]) / rollup["stories"] if rollup["stories"] else 0
+    return {"stories": rollup["stories"], "avg_max_nesting_level": round(avg_depth, 2), **_aggregate(rollup)}
@@ -0,0 +1,28 @@
+"""Point the app at a throwaway database before any app module is imported.
+
+database.py and main.py read their settings and build the engine at import
+time, so the environment is set here, ahead of the test modules.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+_data_dir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_data_dir.name) / 'test.db'}"
+os.environ["SQL_ECHO"] = "0"
+os.environ["MAINTENANCE"] = "0"
+os.environ["EXPORT_DIR"] = str(Path(_data_dir.name) / "exports")
+
+from sqlmodel import Session  # noqa: E402
+from database import engine, init_db  # noqa: E402
+
+init_db(engine)
+
+
+@pytest.fixture
+def session():
+    with Session(engine) as session:
+        yield session
@@ -0,0 +1,44 @@
+from sqlmodel import func, select
+import db
+from models import Operation, TryCard
+from ordering import MAX_KEY_LENGTH
+
+
+def _story(session, count: int) -> list[int]:
+    db.clear_all_cards(session, 1)
+    return [db.create_try_card(session, "Failure", n, f"Try {n}", "Fails", "Worse").id for n in range(1, count + 1)]
+
+
+def _labels(session) -> list[tuple[int, int]]:
+    """(card id, order_num) in list order."""
+    cards = session.exec(select(TryCard).where(TryCard.story_id == 1).order_by(TryCard.order_key, TryCard.id))
+    return [(card.id, card.order_num) for card in cards]
+
+
+def _operations(session) -> int:
+    return session.exec(select(func.count()).select_from(Operation).where(Operation.story_id == 1)).one()
+
+
+def test_move_renumbers_the_list_in_one_undo_entry(session):
+    first, second, third, fourth = _story(session, 4)
+    logged = _operations(session)
+
+    db.move_try_card(session, fourth, first)
+
+    assert _labels(session) == [(first, 1), (fourth, 2), (second, 3), (third, 4)]
+    assert _operations(session) == logged + 1
+    db.undo(session, 1)
+    session.expire_all()
+    assert _labels(session) == [(first, 1), (second, 2), (third, 3), (fourth, 4)]
+
+
+def test_moves_that_exhaust_the_keys_respread_them(session):
+    first, *_ = _story(session, 3)
+    for _ in range(10 * MAX_KEY_LENGTH):
+        # Each move lands between the first card and its follower, narrowing that gap
+        last_id, _ = _labels(session)[-1]
+        db.move_try_card(session, last_id, first)
+
+    cards = session.exec(select(TryCard).where(TryCard.story_id == 1)).all()
+    assert max(len(card.order_key) for card in cards) <= MAX_KEY_LENGTH
+    assert [number for _, number in _labels(session)] == [1, 2, 3]
@@ -0,0 +1,71 @@
+"""Smoke test of the PostgreSQL backend against a throwaway server.
+
+Needs the psycopg driver, testing.postgresql and the PostgreSQL server
+binaries (initdb, postgres) on PATH; skipped when any of them is missing.
+"""
+
+import json
+import pytest
+from sqlalchemy import inspect, text
+from sqlmodel import Session, select
+
+pytest.importorskip("psycopg")
+testing_postgresql = pytest.importorskip("testing.postgresql")
+
+import db  # noqa: E402
+import stats  # noqa: E402
+from database import init_db, make_engine  # noqa: E402
+from models import TryCard  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def pg_engine():
+    try:
+        server = testing_postgresql.Postgresql()
+    except RuntimeError as error:
+        # Raised when initdb or postgres cannot be found
+        pytest.skip(f"PostgreSQL server not available: {error}")
+    engine = make_engine(server.url().replace("postgresql://", "postgresql+psycopg://", 1))
+    init_db(engine)
+    yield engine
+    engine.dispose()
+    server.stop()
+
+
+def test_init_db_migrates_an_older_schema(pg_engine):
+    with pg_engine.begin() as connection:
+        connection.execute(text("ALTER TABLE try_cards DROP COLUMN order_key"))
+        connection.execute(text(
+            "INSERT INTO try_cards (story_id, type, attempt, failure, consequence, order_num, version,"
+            " attempt_length, failure_length, consequence_length)"
+            " VALUES (1, 'Failure', 'Tries', 'Fails', 'Worse', 1, 1, 5, 5, 5)"
+        ))
+
+    init_db(pg_engine)
+
+    inspector = inspect(pg_engine)
+    assert "order_key" in {column["name"] for column in inspector.get_columns("try_cards")}
+    assert "ix_try_cards_story_id_order_key" in {index["name"] for index in inspector.get_indexes("try_cards")}
+    with Session(pg_engine) as session:
+        assert all(card.order_key for card in session.exec(select(TryCard)))
+
+
+def test_card_round_trip(pg_engine):
+    with Session(pg_engine) as session:
+        db.clear_all_cards(session, 1)
+        card = db.create_mice_card(session, "M", "Arrives", "Leaves", 1)
+
+        updated = db.update_mice_card(session, card.id, card.version, "M", "Arrives late", "Leaves", 2)
+        assert updated.version == card.version + 1
+        # A save made against the old version conflicts instead of overwriting
+        assert db.update_mice_card(session, card.id, card.version, "M", "Stale", "Leaves", 1) is None
+        assert db.get_mice_card(session, card.id).opening == "Arrives late"
+
+        db.undo(session, 1)
+        assert db.get_mice_card(session, card.id).opening == "Arrives"
+
+        # Averages come back as Decimal here; the stats must still encode as JSON
+        json.dumps(stats.story_stats(session, 1, db.get_story_version(session, 1)))
+
+        assert db.delete_mice_card(session, card.id)
+        assert db.get_story_cards(session, 1) == ([], [])
@@ -0,0 +1,60 @@
+from sqlmodel import func, select
+import db
+from models import MiceCard, Operation
+
+
+def _add_mice_card(session, story_id: int, code: str) -> MiceCard:
+    """Create a card in any story through the same logged path as db.create_mice_card."""
+    card = MiceCard(story_id=story_id, code=code, opening="Opens", closing="Closes", nesting_level=1)
+    session.add(card)
+    session.flush()
+    changes = [db._change(card, None, card.model_dump())]
+    db._commit(session, changes, db._log_operation(session, story_id, "create_mice_card", changes))
+    return card
+
+
+def test_undo_only_reverts_its_own_story(session):
+    db.clear_all_cards(session, 1)
+    db.clear_all_cards(session, 2)
+    mine = _add_mice_card(session, 1, "M")
+    theirs = _add_mice_card(session, 2, "I")
+
+    db.undo(session, 1)
+
+    assert session.get(MiceCard, mine.id) is None
+    assert session.get(MiceCard, theirs.id) is not None
+
+
+def test_undo_of_a_delete_whose_id_was_reused(session):
+    db.clear_all_cards(session, 1)
+    db.clear_all_cards(session, 2)
+    card = _add_mice_card(session, 1, "M")
+    card_id = card.id
+    db.delete_mice_card(session, card_id)
+    # SQLite hands the highest freed rowid to the next insert, here another story's card
+    other = _add_mice_card(session, 2, "I")
+    assert other.id == card_id
+
+    db.undo(session, 1)
+    restored = session.exec(select(MiceCard).where(MiceCard.story_id == 1)).one()
+    assert restored.id != card_id
+    assert session.get(MiceCard, card_id).story_id == 2
+
+    # Redo deletes the restored card, not the other story's card that took its old id
+    db.redo(session, 1)
+    assert session.exec(select(MiceCard).where(MiceCard.story_id == 1)).all() == []
+    assert session.get(MiceCard, card_id) is not None
+
+
+def test_each_story_log_is_compacted(session):
+    db.clear_all_cards(session, 1)
+    db.clear_all_cards(session, 2)
+    card = _add_mice_card(session, 1, "M")
+    for n in range(db.UNDO_LOG_LIMIT + db.COMPACT_EVERY):
+        # Other stories take every even operation id, so no story 1 id is a multiple of COMPACT_EVERY
+        while session.exec(select(func.max(Operation.id))).one() % 2:
+            _add_mice_card(session, 2, "I")
+        card = db.update_mice_card(session, card.id, card.version, "M", f"Draft {n}", "Closes", 1)
+
+    logged = session.exec(select(Operation).where(Operation.story_id == 1)).all()
+    assert len(logged) < db.UNDO_LOG_LIMIT + db.COMPACT_EVERY
@@ -0,0 +1,61 @@
+"""Request coalescing and rate limiting for the busiest routes.
+
+Coalescing: when many clients load the same story at once, concurrent
+requests for the same key share one computation instead of each running
+the same queries and render.
+
+Rate limiting: each client gets a token bucket for mutations, so one client
+cannot keep the single SQLite writer busy for everybody else.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections.abc import Awaitable, Callable, Hashable
+
+# Sustained mutations per second per client, and how many may arrive in a burst
+MUTATION_RATE = float(os.environ.get("MUTATION_RATE", "5"))
+MUTATION_BURST = int(os.environ.get("MUTATION_BURST", "20"))
+# Above this many tracked clients, buckets that have refilled are forgotten
+MAX_TRACKED_CLIENTS = 10_000
+
+_in_flight: dict[Hashable, asyncio.Future] = {}
+
+# Client key -> (tokens left, time of last refill)
+_buckets: dict[str, tuple[float, float]] = {}
+_buckets_lock = threading.Lock()
+
+
+async def coalesce[T](key: Hashable, compute: Callable[[], Awaitable[T]]) -> T:
+    """Await compute() once for all concurrent callers that share a key.
+
+    Callers are shielded from each other, so a client that disconnects does
+    not cancel the work other clients are waiting on.
+    """
+    future = _in_flight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(compute())
+        _in_flight[key] = future
+        future.add_done_callback(lambda _: _in_flight.pop(key, None))
+    return await asyncio.shield(future)
+
+
+def _forget_refilled_buckets(now: float):
+    refill_seconds = MUTATION_BURST / MUTATION_RATE
+    for client, (_, updated) in list(_buckets.items()):
+        if now - updated >= refill_seconds:
+            del _buckets[client]
+
+
+def take_token(client: str) -> bool:
+    """Spend one mutation token for the client; False if the bucket is empty."""
+    now = time.monotonic()
+    with _buckets_lock:
+        tokens, updated = _buckets.get(client, (MUTATION_BURST, now))
+        tokens = min(MUTATION_BURST, tokens + (now - updated) * MUTATION_RATE)
+        allowed = tokens >= 1
+        _buckets[client] = (tokens - 1 if allowed else tokens, now)
+        if len(_buckets) > MAX_TRACKED_CLIENTS:
+            _forget_refilled_buckets(now)
+    return allowed
@@ -0,0 +1,49 @@
+"""Structural checks for MICE nesting.
+
+MICE threads nest like boxes: they open from level 1 inward and close in
+reverse order. That only works when every level from 1 to the deepest is held
+by exactly one thread, so the checks look for levels below 1, levels shared by
+two threads (which leaves their closing order undefined), and skipped levels.
+"""
+
+from models import MiceCard
+
+# Latest result per story as (story version, issues); reused until the story changes
+_cache: dict[int, tuple[int, dict[int, list[str]]]] = {}
+
+
+def validate_nesting(mice_cards: list[MiceCard]) -> dict[int, list[str]]:
+    """Return the nesting problems found for each card, keyed by card id.
+
+    Runs in linear time: one pass indexes cards by level, one pass checks them.
+    """
+    first_at_level: dict[int, MiceCard] = {}
+    for card in mice_cards:
+        first_at_level.setdefault(card.nesting_level, card)
+
+    issues: dict[int, list[str]] = {}
+    for card in mice_cards:
+        card_issues = []
+        level = card.nesting_level
+        if level < 1:
+            card_issues.append("Nesting level must be 1 or higher")
+        first = first_at_level[level]
+        if first is not card:
+            card_issues.append(
+                f"Shares level {level} with {first.code} thread, so their closing order is undefined"
+            )
+        if level > 1 and level - 1 not in first_at_level:
+            card_issues.append(f"Level {level - 1} is missing, so nothing encloses this thread")
+        if card_issues:
+            issues[card.id] = card_issues
+    return issues
+
+
+def validate_story(story_id: int, story_version: int, mice_cards: list[MiceCard]) -> dict[int, list[str]]:
+    """Validate a story's nesting, reusing the last result while the story is unchanged."""
+    cached = _cache.get(story_id)
+    if cached and cached[0] == story_version:
+        return cached[1]
+    issues = validate_nesting(mice_cards)
+    _cache[story_id] = (story_version, issues)
+    return issues
@@ -0,0 +1,246 @@
+"""Optional write-behind mode for card edits.
+
+With WRITE_BEHIND=1, card saves are acknowledged once they are checked
+against the card's version, appended to a journal file and queued in memory. A background thread folds repeated saves of
+the same card together and commits the queue every FLUSH_INTERVAL_SECONDS, or
+sooner once FLUSH_THRESHOLD cards are waiting, in one transaction (one per
+story database when sharding is on).
+
+Crash safety: the journal is written before a save is acknowledged and is only
+removed after the batch holding it has committed, so a restart replays every
+acknowledged save. By default the journal is flushed to the OS, which survives
+a process crash; set WRITE_BEHIND_FSYNC=1 to also survive power loss at the
+cost of one fsync per save. Replays are harmless because each update is
+conditional on the card version it was made against.
+
+A batch whose commit fails (say the database stays locked past busy_timeout)
+goes back to the front of the queue and its journal is kept; later saves are
+appended to that journal rather than rotating over it, and the next flush
+retries the whole queue. The flusher thread reports the error and keeps going.
+
+A queued save that turns out to conflict at flush time is dropped, and pages of
+that story are told to reload so they show what was actually kept.
+
+The journal belongs to one process, so use this mode with a single worker.
+"""
+
+import json
+import os
+import threading
+import traceback
+from collections.abc import Callable
+from pathlib import Path
+from sqlalchemy import Engine
+from sqlmodel import Session
+import db
+import feed
+
+ENABLED = os.environ.get("WRITE_BEHIND", "0") == "1"
+FSYNC = os.environ.get("WRITE_BEHIND_FSYNC", "0") == "1"
+JOURNAL_PATH = Path(os.environ.get("WRITE_BEHIND_JOURNAL", "write_behind.journal"))
+FLUSH_INTERVAL_SECONDS = float(os.environ.get("WRITE_BEHIND_INTERVAL", "0.05"))
+FLUSH_THRESHOLD = int(os.environ.get("WRITE_BEHIND_THRESHOLD", "200"))
+
+# Journal of the batch being committed; kept until the commit succeeds, so it
+# also holds a batch whose commit failed until a retry commits it
+_FLUSHING_PATH = JOURNAL_PATH.with_name(JOURNAL_PATH.name + ".flushing")
+
+# Queued edits keyed by (table, story id, card id); card ids repeat across story shards
+_pending: dict[tuple[str, int, int], dict] = {}
+_pending_lock = threading.Lock()
+# Serializes flushes between the background thread and request-triggered flushes
+_flush_lock = threading.Lock()
+_wake = threading.Event()
+_stop = threading.Event()
+_journal = None
+_engine_for: Callable[[int], Engine] | None = None
+
+
+def _queue(item: dict) -> bool:
+    """Fold an edit into the pending queue; False if it conflicts with a queued edit."""
+    key = (item["table"], item["story_id"], item["id"])
+    queued = _pending.get(key)
+    if queued is None:
+        _pending[key] = item
+        return True
+    # Each queued save advances the card one version, so a follow-up save must build on all of them
+    if item["version"] != queued["version"] + queued["edits"]:
+        return False
+    queued["fields"].update(item["fields"])
+    queued["edits"] += item["edits"]
+    return True
+
+
+def _stored_version(table: str, story_id: int, card_id: int) -> int | None:
+    with Session(_engine_for(story_id)) as session:
+        return db.get_card_version(session, table, card_id)
+
+
+def enqueue(table: str, story_id: int, card_id: int, version: int, fields: dict) -> bool:
+    """Journal and queue one card save. Returns False if the card is missing or the save conflicts.
+
+    The first queued save of a card is checked against the version stored in
+    the database, later ones against the saves queued before them. A save
+    checked against the queue just as that queue is flushed is not checked
+    again; if it was stale it conflicts at flush time instead.
+    """
+    item = {"table": table, "story_id": story_id, "id": card_id, "version": version, "edits": 1, "fields": fields}
+    if (table, story_id, card_id) not in _pending and _stored_version(table, story_id, card_id) != version:
+        return False
+    with _pending_lock:
+        if not _queue(item):
+            return False
+        _journal.write(json.dumps(item) + "\n")
+        _journal.flush()
+        if FSYNC:
+            os.fsync(_journal.fileno())
+        if len(_pending) >= FLUSH_THRESHOLD:
+            _wake.set()
+    return True
+
+
+def has_pending() -> bool:
+    return bool(_pending)
+
+
+def _rotate_journal():
+    """Move the journal's saves into the flushing journal, which then covers the whole queue."""
+    global _journal
+    _journal.close()
+    if _FLUSHING_PATH.exists():
+        # An earlier batch failed to commit and is back in the queue; its
+        # journal must survive until a retry commits it, so add to it
+        with _FLUSHING_PATH.open("a") as flushing:
+            flushing.write(JOURNAL_PATH.read_text())
+            flushing.flush()
+            if FSYNC:
+                os.fsync(flushing.fileno())
+        _journal = JOURNAL_PATH.open("w")
+    else:
+        JOURNAL_PATH.replace(_FLUSHING_PATH)
+        _journal = JOURNAL_PATH.open("a")
+
+
+def _requeue(batch: list[dict]) -> list[dict]:
+    """Put a batch that failed to commit back ahead of the saves queued since; return those that now conflict.
+
+    The flushing journal is rewritten to hold just this batch, since saves of
+    stories that did commit would otherwise conflict on replay and drag down
+    later saves folded onto them.
+    """
+    partial_path = _FLUSHING_PATH.with_name(_FLUSHING_PATH.name + ".partial")
+    with partial_path.open("w") as partial:
+        partial.writelines(json.dumps(item) + "\n" for item in batch)
+        partial.flush()
+        if FSYNC:
+            os.fsync(partial.fileno())
+    partial_path.replace(_FLUSHING_PATH)
+    newer = list(_pending.values())
+    _pending.clear()
+    for item in batch:
+        _queue(item)
+    return [item for item in newer if not _queue(item)]
+
+
+def flush():
+    """Commit every queued edit, in one transaction per story database.
+
+    If the commit fails, the batch is queued again before the error is raised.
+    """
+    with _flush_lock:
+        with _pending_lock:
+            if not _pending:
+                return
+            batch = list(_pending.values())
+            _pending.clear()
+            _rotate_journal()
+
+        try:
+            conflicts = _apply(batch)
+        except Exception:
+            with _pending_lock:
+                conflicts = _requeue(batch)
+            for story_id in {item["story_id"] for item in conflicts}:
+                feed.publish_reload(story_id)
+            raise
+        _FLUSHING_PATH.unlink()
+
+        for story_id in {item["story_id"] for item in conflicts}:
+            feed.publish_reload(story_id)
+
+
+def _apply(batch: list[dict]) -> list[dict]:
+    """Commit a batch in one transaction per story database and return the conflicts.
+
+    Items are removed from batch as their story commits, so if a commit
+    fails, batch holds what is still to be applied.
+    """
+    conflicts = []
+    for story_id in {item["story_id"] for item in batch}:
+        with Session(_engine_for(story_id)) as session:
+            conflicts += db.apply_queued_updates(session, [item for item in batch if item["story_id"] == story_id])
+        batch[:] = [item for item in batch if item["story_id"] != story_id]
+    return conflicts
+
+
+def _read_journal(path: Path) -> list[dict]:
+    if not path.exists():
+        return []
+    # Every save is written as one line ending in a newline; text after the
+    # last newline is a save cut off by a crash, which was never acknowledged
+    return [json.loads(line) for line in path.read_text().split("\n")[:-1]]
+
+
+def _replay(path: Path):
+    """Apply the saves in one journal file as a single batch, then delete it."""
+    for item in _read_journal(path):
+        # A replayed save that conflicts is dropped, just as enqueue rejected it the first time
+        _queue(item)
+    if _pending:
+        batch = list(_pending.values())
+        _pending.clear()
+        _apply(batch)
+    path.unlink(missing_ok=True)
+
+
+def _recover():
+    """Replay journals left by a previous run.
+
+    The batch that was mid-flush goes first and on its own: if it had already
+    committed, its saves now conflict and drop out without dragging down the
+    later saves that build on them.
+    """
+    _replay(_FLUSHING_PATH)
+    _replay(JOURNAL_PATH)
+
+
+def _run():
+    while not _stop.is_set():
+        _wake.wait(FLUSH_INTERVAL_SECONDS)
+        _wake.clear()
+        try:
+            flush()
+        except Exception:
+            # The batch is queued again; retry on the next interval
+            traceback.print_exc()
+
+
+def start(engine_for: Callable[[int], Engine]):
+    """Replay any leftover journal, then start the background flusher; engine_for gives each story's database."""
+    global _engine_for, _journal
+    _engine_for = engine_for
+    _recover()
+    _journal = JOURNAL_PATH.open("a")
+    _stop.clear()
+    threading.Thread(target=_run, name="write-behind", daemon=True).start()
+
+
+def stop():
+    """Stop the flusher and commit whatever is still queued."""
+    _stop.set()
+    _wake.set()
+    try:
+        flush()
+    finally:
+        # Whatever could not be committed stays journaled and is replayed on the next start
+        _journal.close()